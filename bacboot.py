@@ -6,6 +6,12 @@ import unicodedata
 import argparse
 import logging
 import time
+import shlex
+import json
+import math
+import collections
+# Anything we don't need just to parse the command line (asyncio, the delta and dry-run helpers, urllib.request, tarfile,
+# http.server...) is imported by the functions that use it, so that --help and the menu start as quickly as they used to.
 
 # Cruft used to improve autodetection of success and failure states
 EMOJI_RANGES = [
@@ -14,7 +20,6 @@ EMOJI_RANGES = [
     (0x1F680, 0x1F6C0),
     (0x1F170, 0x1F251)
 ]
-EMOJI_CHARS = "".join([chr(c) for r in EMOJI_RANGES for c in range(r[0], r[1]+1)])
 # We are not "re-looping" unless we enter the main loop twice
 relooping = False
 
@@ -27,6 +32,9 @@ def log_wrapped(text, level="info"):
     log_func = getattr(logging, level.lower(), logging.info)
     log_func(wrapped_text)
 
+def is_emoji_char(char):
+    return any(start <= ord(char) <= end for start, end in EMOJI_RANGES)
+
 def has_emoji(line):
     for char in line:
         if "Emoji" in unicodedata.name(char, ""):
@@ -38,6 +46,11 @@ def return_to_menu():
     # Wait up to 3 seconds for the user to enter any key.
     # If they make any input, return to the main menu.
     # After 3 seconds, return to the main menu anyways.
+    # We only end up here when something went wrong, and in unattended mode there's nobody at the menu to
+    # pick up the pieces, so stop right away and let whoever ran us know it failed.
+    if args.unattended:
+        logging.error("Running unattended, so we're stopping here.")
+        sys.exit(1)
     # Set relooping to true so we know we're about to loop back into the script
     global relooping
     relooping = True
@@ -52,79 +65,711 @@ def return_to_menu():
         main()
 
 
+# Inventory and remote execution helpers
+def parse_inventory(path):
+    # Read an INI-style Ansible inventory into a list of hosts and the groups they belong to.
+    # We only understand the simple subset BacBoot needs (groups, children, group variables and per-host variables),
+    # which is plenty for the inventories we ship and document.
+    inventory = {"hosts": {}, "groups": {}, "group_vars": {}}
+    children = {}
+    section = "ungrouped"
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].split(";", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1].strip()
+                if section.endswith(":children"):
+                    children.setdefault(section[:-len(":children")], [])
+                elif ":" not in section:
+                    inventory["groups"].setdefault(section, [])
+                continue
+            if section.endswith(":children"):
+                children[section[:-len(":children")]].append(line.split()[0])
+                continue
+            if section.endswith(":vars"):
+                key, _, value = line.partition("=")
+                inventory["group_vars"].setdefault(section[:-len(":vars")], {})[key.strip()] = " ".join(shlex.split(value))
+                continue
+            if ":" in section:
+                continue
+            fields = shlex.split(line)
+            name = fields[0]
+            host = inventory["hosts"].setdefault(name, {"name": name, "vars": {}})
+            for field in fields[1:]:
+                if "=" in field:
+                    key, value = field.split("=", 1)
+                    host["vars"][key] = value
+            if name not in inventory["groups"].setdefault(section, []):
+                inventory["groups"][section].append(name)
+    return finish_inventory(inventory, children)
+
+def finish_inventory(inventory, children):
+    # Fold child groups into their parents so asking for a parent group gives us every host in it.
+    def expand(group, seen):
+        hosts = list(inventory["groups"].get(group, []))
+        for child in children.get(group, []):
+            if child not in seen:
+                hosts += [h for h in expand(child, seen | {child}) if h not in hosts]
+        return hosts
+    for group in children:
+        inventory["groups"][group] = expand(group, {group})
+    # Give each host its groups' variables, with "all" first and the host's own variables winning over everything.
+    for host in inventory["hosts"].values():
+        host["groups"] = [group for group, members in inventory["groups"].items() if host["name"] in members]
+        merged = dict(inventory["group_vars"].get("all", {}))
+        for group in host["groups"]:
+            merged.update(inventory["group_vars"].get(group, {}))
+        merged.update(host["vars"])
+        host["vars"] = merged
+        # Hosts share rollout limits with the first of their groups that sets any (or just their first group).
+        limited = [group for group in host["groups"] + ["all"] if any(key.startswith("bacboot_") for key in inventory["group_vars"].get(group, {}))]
+        host["throttle_group"] = (limited + host["groups"] + ["ungrouped"])[0]
+    return inventory
+
+def is_ini_inventory(path):
+    # Whether an inventory is an INI file we can read ourselves, rather than a directory, a script, or YAML or JSON.
+    if not os.path.isfile(path) or os.access(path, os.X_OK) or path.endswith((".yml", ".yaml", ".json")):
+        return False
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].split(";", 1)[0].strip()
+            if line:
+                return not (line == "---" or line.startswith("{") or line.endswith(":"))
+    return True
+
+def ansible_inventory(path):
+    # Ask Ansible to read any inventory it understands, turning the answer into the same shape as parse_inventory.
+    # --export keeps group variables with their groups, so rollout limits still apply per group.
+    result = run_command(["ansible-inventory", "-i", path, "--list", "--export"], capture=True)
+    if result.returncode != 0:
+        raise ValueError(f"ansible-inventory couldn't read it: {result.stderr.strip()[-200:]}")
+    listing = json.loads(result.stdout)
+    host_vars = listing.get("_meta", {}).get("hostvars", {})
+    inventory = {"hosts": {}, "groups": {}, "group_vars": {}}
+    children = {}
+    for group, entry in listing.items():
+        if group == "_meta":
+            continue
+        inventory["groups"][group] = list(entry.get("hosts", []))
+        if entry.get("children"):
+            children[group] = list(entry["children"])
+        if entry.get("vars"):
+            inventory["group_vars"][group] = {key: str(value) for key, value in entry["vars"].items()}
+        for name in entry.get("hosts", []):
+            inventory["hosts"].setdefault(name, {"name": name, "vars": {key: str(value) for key, value in host_vars.get(name, {}).items()}})
+    # Everything is in "all" one way or another, so it doesn't count as a group of its own here.
+    children.pop("all", None)
+    inventory["groups"].pop("all", None)
+    return finish_inventory(inventory, children)
+
+def load_inventory(path):
+    # Read an inventory in whatever format it's in. INI files we read ourselves, anything else goes through
+    # ansible-inventory. Returns None (after saying why) if neither can make sense of it.
+    try:
+        if is_ini_inventory(path):
+            return parse_inventory(path)
+        if not has_prerequisite("ansible-inventory"):
+            logging.warning(f"{path} isn't an INI inventory, and we need Ansible installed to read any other kind.")
+            return None
+        return ansible_inventory(path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"We couldn't read the inventory {path}: {e}")
+        return None
+
+def inventory_hosts(inventory, groups=None):
+    # Return the hosts in the given groups (or every host), in inventory order and without duplicates.
+    if groups is None:
+        return list(inventory["hosts"].values())
+    names = []
+    for group in groups:
+        for name in inventory["groups"].get(group, []):
+            if name not in names:
+                names.append(name)
+    return [inventory["hosts"][name] for name in names]
+
+def load_target_hosts(args, groups=None):
+    # Work out which hosts an action should touch. Without an inventory, that's just this machine.
+    if not args.inventory:
+        return [{"name": "localhost", "vars": {"ansible_connection": "local"}}]
+    inventory = load_inventory(args.inventory)
+    if inventory is None:
+        logging.error("We can't work out which hosts to use without the inventory. Please check it and try again.")
+        return_to_menu()
+    hosts = inventory_hosts(inventory, groups)
+    if not hosts and groups is not None:
+        # Fall back to every host if the inventory doesn't use the groups we expected.
+        hosts = inventory_hosts(inventory)
+    return hosts
+
+# Where we keep our copy of the Bacalhau playbook.
+BACBOOT_PLAYBOOK_DIR = os.environ.get("BACBOOT_PLAYBOOK_DIR", "/tmp/bacalhau-ansible")
+# Where we keep things between runs, like downloads and timings, so we don't have to work them out twice.
+BACBOOT_CACHE_DIR = os.environ.get("BACBOOT_CACHE_DIR", os.path.expanduser("~/.cache/bacboot"))
+# Host keys BacBoot has scanned and pinned, used alongside your own known_hosts file.
+BACBOOT_KNOWN_HOSTS = os.path.expanduser("~/.ssh/bacboot_known_hosts")
+
+def ssh_address(args, host):
+    # Return the (user@)address and port SSH should use for a host, honouring Ansible's host variables.
+    user = host["vars"].get("ansible_user") or args.user
+    address = host["vars"].get("ansible_host", host["name"])
+    return (f"{user}@{address}" if user else address), host["vars"].get("ansible_port", "22")
+
+def known_hosts_option():
+    # Check your own known_hosts first, then ours. SSH only adds new keys to the first file listed.
+    return f"UserKnownHostsFile={os.path.expanduser('~/.ssh/known_hosts')} {BACBOOT_KNOWN_HOSTS}"
+
+def is_local_host(host):
+    return host["vars"].get("ansible_connection") == "local" or host["name"] in ["localhost", "127.0.0.1", "::1"]
+
+def remote_command(args, host, command, ssh_options=None):
+    # Build the argv needed to run a shell command on a host, either directly or over SSH.
+    if is_local_host(host):
+        return ["sh", "-c", command]
+    target, port = ssh_address(args, host)
+    ssh = ["ssh", "-o", "BatchMode=yes", "-o", "ConnectTimeout=10", "-o", known_hosts_option(), "-p", port] + (ssh_options or [])
+    return ssh + [target, command]
+
+
+# Running external commands
+# Every command BacBoot runs goes through run_process (or run_command, from code that isn't async), so that
+# nothing can hang forever, output can't eat all our memory, and we know how long everything took.
+ProcessResult = collections.namedtuple("ProcessResult", ["returncode", "stdout", "stderr", "duration", "timed_out"])
+# How long each kind of command gets before we give up on it, in seconds. --command-timeout overrides all of these.
+COMMAND_TIMEOUTS = {"ansible-playbook": 4 * 3600, "apt": 1800, "pip3": 1800, "docker": 1800, "git": 600, "ansible-galaxy": 600, "bacalhau": 600, "ssh": 1800}
+DEFAULT_COMMAND_TIMEOUT = 300
+command_timeout_override = None
+# Unless the caller needs all of it, we only keep the last few kilobytes of a command's output, for error messages.
+OUTPUT_TAIL_BYTES = 64 * 1024
+# The most recent commands we ran, and how many of each we've run in total. --command-report saves them as we exit.
+process_history = collections.deque(maxlen=1000)
+process_counts = collections.Counter()
+
+def command_timeout(argv):
+    if command_timeout_override is not None:
+        return command_timeout_override
+    # Look past sudo to the command that's actually doing the work.
+    name = os.path.basename(argv[1] if argv[0] == "sudo" and len(argv) > 1 else argv[0])
+    return COMMAND_TIMEOUTS.get(name, DEFAULT_COMMAND_TIMEOUT)
+
+async def read_output(stream, keep_all, chunks):
+    # Read a stream to the end into chunks, keeping either all of it or just the last OUTPUT_TAIL_BYTES.
+    # The chunks belong to the caller, so whatever we read before a timeout isn't lost.
+    size = 0
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        while not keep_all and size - len(chunks[0]) >= OUTPUT_TAIL_BYTES:
+            size -= len(chunks.popleft())
+
+def output_text(chunks, keep_all):
+    data = b"".join(chunks)
+    return (data if keep_all else data[-OUTPUT_TAIL_BYTES:]).decode(errors="replace")
+
+def has_terminal():
+    # Whether we have a terminal that commands could ask for passwords on.
+    try:
+        os.close(os.open("/dev/tty", os.O_RDWR))
+        return True
+    except OSError:
+        return False
+
+async def stop_process(process, own_group):
+    # Ask nicely, then insist. A command with a process group of its own takes everything it started down with it,
+    # like the apt under a sudo or the forks of an ansible-playbook.
+    import asyncio
+    import signal
+    def send(sig):
+        try:
+            if own_group:
+                os.killpg(process.pid, sig)
+            elif process.returncode is None:
+                process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+    send(signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), 5)
+    except asyncio.TimeoutError:
+        send(signal.SIGKILL)
+        await process.wait()
+    else:
+        # Catch anything that outlived the command itself.
+        send(signal.SIGKILL)
+
+async def run_process(argv, timeout=None, stdin_path=None, input=None, input_chunks=None, capture=False, interactive=False, env=None, cwd=None):
+    # Run a command, returning a ProcessResult. Options:
+    #   timeout: seconds before we stop the command. Defaults to a sensible limit for the kind of command it is.
+    #   stdin_path / input: stream a file, or send some bytes, to the command's standard input.
+    #   input_chunks: send whatever an async iterator of bytes gives us to standard input, as it gives it to us.
+    #   interactive: let the command read from our standard input, for things like password prompts.
+    #     Other commands (and every command, when there's no terminal to share) get a session of their own,
+    #     so stopping them stops everything they started too. Interactive ones have to stay in ours to keep the terminal,
+    #     so only the command itself is stopped (sudo passes that on to whatever it's running).
+    #   capture: keep all of stdout (for output we need to parse). Otherwise only the tail is kept.
+    # A command that times out, is cancelled or doesn't exist never raises. It just gets a returncode of -1
+    # (and anything it started is stopped), except that cancellation is passed on once the command is cleaned up.
+    import asyncio
+    timeout = timeout or command_timeout(argv)
+    start = time.monotonic()
+    if stdin_path:
+        stdin = open(stdin_path, "rb")
+    elif input is not None or input_chunks is not None:
+        stdin = subprocess.PIPE
+    else:
+        stdin = None if interactive else subprocess.DEVNULL
+    process, timed_out = None, False
+    try:
+        own_group = not interactive or not has_terminal()
+        process = await asyncio.create_subprocess_exec(*argv, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, cwd=cwd,
+                                                       start_new_session=own_group)
+    except OSError as e:
+        result = ProcessResult(-1, "", str(e), 0.0, False)
+    finally:
+        if stdin_path:
+            stdin.close()
+    if process:
+        async def feed():
+            # Write our input while the output is being read, so neither side can fill up a pipe and get stuck.
+            if input is not None or input_chunks is not None:
+                try:
+                    if input is not None:
+                        process.stdin.write(input)
+                        await process.stdin.drain()
+                    else:
+                        async for chunk in input_chunks:
+                            process.stdin.write(chunk)
+                            await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    # If the command stopped reading early, let the iterator clean up (and close its file) now.
+                    if input_chunks is not None:
+                        await input_chunks.aclose()
+                process.stdin.close()
+        stdout, stderr = collections.deque(), collections.deque()
+        work = asyncio.gather(read_output(process.stdout, capture, stdout), read_output(process.stderr, False, stderr), feed())
+        try:
+            await asyncio.wait_for(work, timeout)
+            await process.wait()
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            await stop_process(process, own_group)
+            if not timed_out:
+                raise
+        error = output_text(stderr, False)
+        if timed_out:
+            # Keep the end of what it said, which usually shows where it got stuck.
+            error = (error.rstrip("\n") + "\n" if error.strip() else "") + f"Timed out after {timeout:g} seconds"
+        result = ProcessResult(-1 if timed_out else process.returncode, output_text(stdout, capture), error, time.monotonic() - start, timed_out)
+    process_counts[os.path.basename(argv[0])] += 1
+    process_history.append({"command": os.path.basename(argv[0]), "returncode": result.returncode, "duration": result.duration, "timed_out": result.timed_out})
+    logging.debug(f"{' '.join(argv)[:200]} exited with {result.returncode} after {result.duration:.2f}s")
+    return result
+
+def write_command_report(path):
+    # Save what we ran and how it went, for --command-report. Runs as we exit, so it mustn't raise.
+    report = {"counts": dict(process_counts), "commands": list(process_history),
+              "failed": sum(1 for entry in process_history if entry["returncode"] != 0),
+              "seconds": round(sum(entry["duration"] for entry in process_history), 3)}
+    try:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        logging.warning(f"We couldn't write the command report to {path}: {e}")
+
+def run_command(argv, **kwargs):
+    # run_process for code that isn't async. Takes the same options.
+    import asyncio
+    return asyncio.run(run_process(argv, **kwargs))
+
+def log_process_failure(result, lines=20):
+    # Show the end of a failed command's error output, which is usually where the useful part is.
+    output = (result.stderr.strip() or result.stdout.strip()).splitlines()
+    for line in output[-lines:]:
+        logging.error(f"    {line}")
+
+# Rollout throttling
+# So a rollout can't saturate a site's uplink or load up nodes that are busy with real work, each group of hosts can have
+# its own limits, set as group variables in the inventory, falling back to the command line:
+#   bacboot_max_hosts: how many of the group's hosts we work on at once (--max-hosts-per-group)
+#   bacboot_bandwidth_limit: bytes per second we send to the group as a whole, like 500K or 10M (--bandwidth-limit)
+#   bacboot_max_load: put off a host while its 1 minute load average per CPU is above this (--max-load)
+#   bacboot_max_jobs: put off a host while it's running more Bacalhau jobs than this (--max-running-jobs)
+# Hosts we put off go to the back of the queue and are tried again every --defer-interval seconds, for up to --defer-timeout.
+# Ansible playbook runs can't be throttled host by host, so they go in batches instead (see ansible_batches), and
+# nothing limits the bandwidth of downloads the hosts make themselves.
+THROTTLE_CHUNK_SIZE = 64 * 1024
+# The running job count comes from the host's own Bacalhau agent, whichever way its jobs are executed.
+HOST_BUSY_SCRIPT = (
+    "cat /proc/loadavg; nproc; "
+    "bacalhau agent node --output json 2>/dev/null | grep -o '\"RunningExecutions\": *[0-9]*' | grep -o '[0-9]*$'"
+)
+
+def parse_rate(value):
+    # Turn a rate like "500K" or "10M" (bytes per second) into a number of bytes per second.
+    # Raises ValueError for anything else, including rates under one byte per second, which would never send anything.
+    if value in [None, ""]:
+        return None
+    text = str(value).strip().upper().removesuffix("/S").removesuffix("B")
+    multiplier = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(text[-1:], 1)
+    try:
+        rate = float(text[:-1] if multiplier > 1 else text) * multiplier
+    except ValueError:
+        raise ValueError(f"{value!r} isn't a rate in bytes per second, like 500K or 10M")
+    if not (math.isfinite(rate) and rate >= 1):
+        raise ValueError(f"{value!r} isn't a usable rate. It needs to be at least one byte per second")
+    return rate
+
+def rate_argument(value):
+    # argparse type for --bandwidth-limit, so a bad rate is caught before we start.
+    try:
+        return parse_rate(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def throttle_setting(host, variable, default, convert, minimum):
+    # One of a host's limits, from its inventory variables or the command line, checked to make sense.
+    value = host["vars"].get(variable, default)
+    if value in [None, ""]:
+        return None
+    try:
+        number = convert(value)
+    except ValueError:
+        number = None
+    if number is None or not number >= minimum:
+        kind = "a whole number" if convert is int else "a number"
+        raise ValueError(f"{host['name']}: {variable} needs to be {kind} of at least {minimum}, not {value!r}")
+    return number
+
+def host_throttle_limits(args, host):
+    # The limits that apply to a host, from its inventory variables or the command line.
+    # Raises ValueError if any of them don't make sense.
+    try:
+        bandwidth = parse_rate(host["vars"].get("bacboot_bandwidth_limit", args.bandwidth_limit))
+    except ValueError as e:
+        raise ValueError(f"{host['name']}: bacboot_bandwidth_limit {e}")
+    return {
+        "group": host.get("throttle_group", "ungrouped"),
+        "max_hosts": throttle_setting(host, "bacboot_max_hosts", args.max_hosts_per_group, int, 1),
+        "bandwidth": bandwidth,
+        "max_load": throttle_setting(host, "bacboot_max_load", args.max_load, float, 0),
+        "max_jobs": throttle_setting(host, "bacboot_max_jobs", args.max_running_jobs, int, 0),
+    }
+
+def check_throttle_limits(args, hosts, bandwidth_ignored=None):
+    # Check every host's limits before we touch any of them, so a typo can't stop a rollout halfway through.
+    # bandwidth_ignored says why the hosts fetch Bacalhau themselves, where there's no bandwidth for us to limit.
+    # Asking for a bandwidth limit there is a mistake, but a group's bacboot_bandwidth_limit may be meant for other methods.
+    problems, unlimited_groups = [], []
+    for host in hosts:
+        try:
+            limits = host_throttle_limits(args, host)
+        except ValueError as e:
+            problems.append(str(e))
+            continue
+        if bandwidth_ignored and limits["bandwidth"] and limits["group"] not in unlimited_groups:
+            unlimited_groups.append(limits["group"])
+    if bandwidth_ignored and args.bandwidth_limit:
+        problems.append(f"--bandwidth-limit can't be used here, because {bandwidth_ignored}.")
+    elif unlimited_groups:
+        logging.warning(f"bacboot_bandwidth_limit is ignored for {', '.join(unlimited_groups)}, because {bandwidth_ignored}.")
+    for problem in problems:
+        logging.error(problem)
+    return not problems
+
+def throttle_requested(args, hosts):
+    # Whether any of the hosts has a limit on how many of them we work on at once, or on how busy they may be.
+    return any(limits["max_hosts"] or limits["max_load"] is not None or limits["max_jobs"] is not None
+               for limits in (host_throttle_limits(args, host) for host in hosts))
+
+def new_throttle(args):
+    # Everything the hosts in one rollout share: the overall --forks limit, and each group's slots and bandwidth.
+    import asyncio
+    return {"semaphore": asyncio.Semaphore(args.forks), "groups": {}, "buckets": {}}
+
+async def take_bandwidth(bucket, amount):
+    # Token bucket: wait until we're allowed to send this many more bytes. Up to one second's worth can be sent in a burst.
+    import asyncio
+    while True:
+        now = time.monotonic()
+        bucket["tokens"] = min(bucket["rate"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+        bucket["updated"] = now
+        if bucket["tokens"] >= amount:
+            bucket["tokens"] -= amount
+            return
+        await asyncio.sleep((amount - bucket["tokens"]) / bucket["rate"])
+
+async def throttled_chunks(bucket, path=None, data=None):
+    # Hand out a file (or some bytes) in chunks, no faster than the bucket allows.
+    chunk_size = int(min(THROTTLE_CHUNK_SIZE, max(bucket["rate"], 1)))
+    f = open(path, "rb") if path else None
+    try:
+        position = 0
+        while True:
+            chunk = f.read(chunk_size) if f else data[position:position + chunk_size]
+            position += len(chunk)
+            if not chunk:
+                return
+            await take_bandwidth(bucket, len(chunk))
+            yield chunk
+    finally:
+        if f:
+            f.close()
+
+def throttled_input(bucket, argv, path=None, data=None):
+    # The run_process options that send a file (or some bytes) to a command, throttled if there's a bucket.
+    # A throttled send gets as long as it could take at the group's rate, with every host in the group sharing it,
+    # on top of the command's usual timeout.
+    if not bucket:
+        return {"stdin_path": path} if path else {"input": data}
+    size = os.path.getsize(path) if path else len(data)
+    return {"input_chunks": throttled_chunks(bucket, path, data),
+            "timeout": command_timeout(argv) + size * bucket["sharing"] / bucket["rate"]}
+
+async def host_busy(args, host, limits):
+    # Check whether a host is too busy to work on right now, returning the reason if it is.
+    if limits["max_load"] is None and limits["max_jobs"] is None:
+        return None
+    result = await run_process(remote_command(args, host, HOST_BUSY_SCRIPT, ssh_multiplex_options()), timeout=60, capture=True)
+    lines = result.stdout.splitlines()
+    try:
+        load, cpus = float(lines[0].split()[0]), max(int(lines[1]), 1)
+    except (IndexError, ValueError):
+        # If we can't tell, carry on. The work itself will fail if the host really can't be reached.
+        return None
+    jobs = int(lines[2]) if len(lines) > 2 and lines[2].strip().isdigit() else 0
+    if limits["max_load"] is not None and load / cpus > limits["max_load"]:
+        return f"load average is {load:g} on {cpus} CPU(s)"
+    if limits["max_jobs"] is not None and jobs > limits["max_jobs"]:
+        return f"{jobs} Bacalhau job(s) running"
+    return None
+
+async def run_throttled(args, throttle, host, work):
+    # Run work(bucket) for a host once its group has a free slot and the host isn't too busy, where bucket is the group's
+    # bandwidth limit (or None). A busy host gives up its slot and is tried again later, so the rest of the rollout carries on.
+    # Returns whatever work returns, or None if the host stayed busy for longer than --defer-timeout.
+    import asyncio
+    limits = host_throttle_limits(args, host)
+    group = limits["group"]
+    if limits["max_hosts"] and group not in throttle["groups"]:
+        throttle["groups"][group] = asyncio.Semaphore(limits["max_hosts"])
+    if limits["bandwidth"] and group not in throttle["buckets"]:
+        # Remember how many hosts could be sharing the bucket at once, so a send can be given long enough to finish.
+        sharing = min(limits["max_hosts"] or args.forks, args.forks)
+        throttle["buckets"][group] = {"rate": limits["bandwidth"], "tokens": 0.0, "updated": time.monotonic(), "sharing": sharing}
+    group_semaphore = throttle["groups"].get(group)
+    deadline = time.monotonic() + args.defer_timeout
+    while True:
+        if group_semaphore:
+            await group_semaphore.acquire()
+        try:
+            async with throttle["semaphore"]:
+                reason = await host_busy(args, host, limits)
+                if not reason:
+                    return await work(throttle["buckets"].get(group))
+        finally:
+            if group_semaphore:
+                group_semaphore.release()
+        if time.monotonic() + args.defer_interval > deadline:
+            logging.warning(f"{host['name']}: still busy ({reason}), so we've left it alone.")
+            return None
+        logging.info(f"{host['name']}: busy ({reason}), we'll come back to it in {format_duration(args.defer_interval)}.")
+        await asyncio.sleep(args.defer_interval)
+
+def ansible_batches(args, hosts):
+    # Yield the batches of hosts for Ansible to run on one after another (with --limit): at most --batch-size hosts and
+    # each group's bacboot_max_hosts at a time, leaving out hosts that are too busy until they aren't.
+    # A host that stays busy for longer than --defer-timeout is left alone, and never shows up in a batch.
+    import asyncio
+    limits = {host["name"]: host_throttle_limits(args, host) for host in hosts}
+    async def find_busy(candidates):
+        semaphore = asyncio.Semaphore(args.forks)
+        async def busy(host):
+            async with semaphore:
+                return await host_busy(args, host, limits[host["name"]])
+        return await asyncio.gather(*[busy(host) for host in candidates])
+    pending, busy_since = list(hosts), {}
+    while pending:
+        # Fill the batch in inventory order, checking hosts as we go, and replacing any that turn out to be busy.
+        batch, taken, unchecked, busy = [], collections.Counter(), list(pending), {}
+        while not (args.batch_size and len(batch) >= args.batch_size):
+            candidates = []
+            for host in unchecked:
+                group, max_hosts = limits[host["name"]]["group"], limits[host["name"]]["max_hosts"]
+                if args.batch_size and len(batch) + len(candidates) >= args.batch_size:
+                    break
+                if not (max_hosts and taken[group] >= max_hosts):
+                    candidates.append(host)
+                    taken[group] += 1
+            if not candidates:
+                break
+            unchecked = [host for host in unchecked if host not in candidates]
+            for host, reason in zip(candidates, asyncio.run(find_busy(candidates))):
+                if reason:
+                    busy[host["name"]] = reason
+                    taken[limits[host["name"]]["group"]] -= 1
+                else:
+                    batch.append(host)
+        now = time.monotonic()
+        for host in list(pending):
+            name = host["name"]
+            if host in batch:
+                pending.remove(host)
+            elif name in busy:
+                if now - busy_since.setdefault(name, now) + args.defer_interval > args.defer_timeout:
+                    logging.warning(f"{name}: still busy ({busy[name]}), so we've left it alone.")
+                    pending.remove(host)
+                else:
+                    logging.info(f"{name}: busy ({busy[name]}), we'll come back to it.")
+            else:
+                busy_since.pop(name, None)
+        if batch:
+            yield batch
+        elif pending:
+            logging.info(f"Every host that's left is busy, so we'll try again in {format_duration(args.defer_interval)}.")
+            time.sleep(args.defer_interval)
+
+async def scan_host_keys(args, hosts):
+    # Ask every host for its SSH host keys at once, returning {host name: [known_hosts lines]}.
+    # Hosts that don't answer within --ssh-timeout get an empty list.
+    import asyncio
+    semaphore = asyncio.Semaphore(args.forks)
+    async def scan(host):
+        async with semaphore:
+            address, port = ssh_address(args, host)
+            address = address.rsplit("@", 1)[-1]
+            result = await run_process(["ssh-keyscan", "-T", str(args.ssh_timeout), "-p", port, address], timeout=args.ssh_timeout + 5, capture=True)
+            return host["name"], [line for line in result.stdout.splitlines() if line and not line.startswith("#")]
+    return dict(await asyncio.gather(*[scan(host) for host in hosts]))
+
+def prefetch_host_keys(args, hosts):
+    # Scan and pin the host keys of every remote host before we connect to them for real,
+    # so nobody has to answer "are you sure you want to continue connecting?" once per machine.
+    # Returns the names of any hosts we couldn't use.
+    import asyncio
+    hosts = [host for host in hosts if not is_local_host(host)]
+    if not hosts or args.skip_host_key_prefetch:
+        return []
+    logging.info(f"Fetching SSH host keys for {len(hosts)} host(s)...")
+    scanned = asyncio.run(scan_host_keys(args, hosts))
+
+    # Work out which keys we've already pinned, by the host field at the start of each line.
+    pinned = {}
+    if os.path.exists(BACBOOT_KNOWN_HOSTS):
+        with open(BACBOOT_KNOWN_HOSTS, "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3:
+                    pinned.setdefault(fields[0], set()).add(" ".join(fields[1:3]))
+
+    unreachable, changed, new_lines = [], [], []
+    for host in hosts:
+        lines = scanned[host["name"]]
+        if not lines:
+            unreachable.append(host["name"])
+            continue
+        key_host = lines[0].split()[0]
+        keys = {" ".join(line.split()[1:3]) for line in lines}
+        if key_host not in pinned:
+            new_lines += lines
+        elif not keys & pinned[key_host]:
+            # Never quietly replace a pinned key. This is exactly what host keys are there to catch.
+            changed.append(host["name"])
+
+    if new_lines:
+        os.makedirs(os.path.dirname(BACBOOT_KNOWN_HOSTS), mode=0o700, exist_ok=True)
+        with open(BACBOOT_KNOWN_HOSTS, "a") as f:
+            f.write("\n".join(new_lines) + "\n")
+    for name in changed:
+        logging.error(f"The SSH host key for {name} has CHANGED since we pinned it! We won't connect to it.")
+        logging.error(f"If you expected this (for example, you rebuilt the machine), remove its lines from {BACBOOT_KNOWN_HOSTS} and try again.")
+    if unreachable:
+        logging.warning(f"We couldn't reach {len(unreachable)} host(s) over SSH: {', '.join(unreachable)}")
+    if not unreachable and not changed:
+        logging.info("All hosts are reachable and their host keys are pinned. 🔑")
+    return unreachable + changed
+
+
 # Download, check and update the playbook repository
 def get_and_check_playbook(args):
     logging.info("First, let's make sure we have a copy of the Ansible playbook for Bacalhau.")
     logging.info("We'll clone the repository from GitHub if we don't already have it.")
-    logging.info("To keep things clean, we'll save the playbook to /tmp/bacalhau-ansible.")
+    logging.info(f"To keep things clean, we'll save the playbook to {BACBOOT_PLAYBOOK_DIR}.")
     logging.info("For security reasons, we will verify that the playbook is untouched before we run it!")
     # TODO (feat): Implement this check after we get signing going.
     # logging.info("We'll also verify that the playbook is signed by the Bacalhau developers.")
     logging.info("")
     logging.info("(If you're confused or this sounds scary, don't worry! We're just making sure you're safe.")
     logging.info("In this case, it's probably safe for you to continue if we don't print any errors and abort.)")
-    if os.path.isdir("/tmp/bacalhau-ansible"):
+    if os.path.isdir(BACBOOT_PLAYBOOK_DIR):
         if not args.silent:
             logging.info("We already have a copy of the playbook. We'll use that.")
             logging.info("But for security, let's check it's a clean and legitimate copy from GitHub.")
             logging.info("Checking...")
-        # Change into the /tmp/bacalhau-ansible directory
-        os.chdir("/tmp/bacalhau-ansible")
+        # Change into the playbook directory
+        os.chdir(BACBOOT_PLAYBOOK_DIR)
         # Check that the repository is clean
-        if subprocess.run(["git", "status", "--porcelain"], stdout=subprocess.DEVNULL).returncode != 0:
+        if run_command(["git", "status", "--porcelain"]).returncode != 0:
             logging.error("The repository is not clean! Please check it and try again.")
             if args.silent:
                 logging.error("You're running in silent mode, but it isn't safe for us to continue. Exiting now...")
                 sys.exit(1)
             return_to_menu()
         # Check that the repository is up to date
-        try:
-            # Check if the local branch is behind the remote branch using 'git remote show origin'
-            remote_output = subprocess.check_output(["git", "remote", "show", "origin"]).decode().strip()
-            is_behind = "local out of date" in remote_output
-
-            # Check if the local branch is behind the remote branch
-            output = subprocess.check_output(["git", "diff", "--name-only", "@{u}"]).decode().strip()
-
-            if is_behind or output:
-                # Set a blank choice by default
-                choice = ""
-
-                logging.warning("The repository is not up to date! We'll try to update it for you now.")
-                if not args.silent:
-                    logging.info("Press [ENTER] to let us know that's okay.")
-                    logging.info("(Or if you want to run it anyways with the current version, type current and press [ENTER].)")
-                    logging.info("Alternatively, enter anything else and we will abort entirely.")
-                    logging.info("")
-                    logging.info("If you're confused or don't know what to do here, just press [ENTER]!")
-                    # Check if the user wants to update the playbook
-                    choice = input()
-                if choice == "":
-                    logging.info("Let's update it for you automatically.")
-                    # Update the playbook and make sure we get a clean return code.
-                    if subprocess.run(["git", "pull"], stdout=subprocess.DEVNULL).returncode != 0:
-                        logging.error("Something went wrong while trying to update the playbook. It's probably not safe for us to continue, so we won't.")
-                        logging.error("Please check it and try again.")
-                        if args.silent:
-                            logging.error("You're running in silent mode, but it isn't safe for us to continue. Exiting now...")
-                        return_to_menu()
-                    logging.info("Updated successfully!")
-                    logging.info("Let's continue!")
-                elif choice == "current":
-                    logging.info("Okay, we'll run it anyways with the current version.")
-                else:
-                    logging.info("Okay, we'll abort entirely.")
-                    return_to_menu()
-            else:
-                logging.info("The repository is up to date!")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error checking Git repository status: {e}")
+        # Check if the local branch is behind the remote branch using 'git remote show origin'
+        remote = run_command(["git", "remote", "show", "origin"], capture=True)
+        # Check if the local branch is behind the remote branch
+        diff = run_command(["git", "diff", "--name-only", "@{u}"], capture=True)
+        if remote.returncode != 0 or diff.returncode != 0:
+            logging.error("Error checking Git repository status:")
+            log_process_failure(remote if remote.returncode != 0 else diff)
             if args.silent:
                 logging.error("You're running in silent mode, but it isn't safe for us to continue. Exiting now...")
                 sys.exit(1)
             return_to_menu()
+        elif "local out of date" in remote.stdout or diff.stdout.strip():
+            # Set a blank choice by default
+            choice = ""
+
+            if args.dry_run:
+                # A dry run doesn't change anything, including our copy of the playbook.
+                logging.warning("The repository is not up to date, but this is a dry run, so we'll use the copy we have without updating it.")
+                choice = "current"
+            else:
+                logging.warning("The repository is not up to date! We'll try to update it for you now.")
+            if not args.silent and not args.dry_run:
+                logging.info("Press [ENTER] to let us know that's okay.")
+                logging.info("(Or if you want to run it anyways with the current version, type current and press [ENTER].)")
+                logging.info("Alternatively, enter anything else and we will abort entirely.")
+                logging.info("")
+                logging.info("If you're confused or don't know what to do here, just press [ENTER]!")
+                # Check if the user wants to update the playbook
+                choice = input()
+            if choice == "":
+                logging.info("Let's update it for you automatically.")
+                # Update the playbook and make sure we get a clean return code.
+                if run_command(["git", "pull"]).returncode != 0:
+                    logging.error("Something went wrong while trying to update the playbook. It's probably not safe for us to continue, so we won't.")
+                    logging.error("Please check it and try again.")
+                    if args.silent:
+                        logging.error("You're running in silent mode, but it isn't safe for us to continue. Exiting now...")
+                    return_to_menu()
+                logging.info("Updated successfully!")
+                logging.info("Let's continue!")
+            elif choice == "current":
+                logging.info("Okay, we'll run it anyways with the current version.")
+            else:
+                logging.info("Okay, we'll abort entirely.")
+                return_to_menu()
+        else:
+            logging.info("The repository is up to date!")
         # # Check that the repository is signed by the Bacalhau developers
-        # if subprocess.run(["git", "verify-commit", "HEAD"], stdout=subprocess.DEVNULL).returncode != 0:
+        # if run_command(["git", "verify-commit", "HEAD"]).returncode != 0:
         #     logging.info("The repository is not signed by the Bacalhau developers! Please check it and try again.")
         #     return_to_menu()
         if not args.silent:
@@ -133,12 +778,12 @@ def get_and_check_playbook(args):
         logging.warning("We don't have a copy of the playbook. We'll clone it from GitHub.")
         logging.info("Cloning...")
         # Check that we have git installed!
-        if subprocess.run(["which", "git"], stdout=subprocess.DEVNULL).returncode != 0:
+        if not has_prerequisite("git"):
             # TODO (feat): We can even handle installing Git for the user! Let's do that if we have to! :)
             logging.error("We don't have git installed! Please install git and try again.")
             return_to_menu()
         # Clone the repository
-        if subprocess.run(["git", "clone", "https://github.com/zorlin/bacalhau-playbook", "/tmp/bacalhau-ansible"], stdout=subprocess.DEVNULL).returncode != 0:
+        if run_command(["git", "clone", "https://github.com/zorlin/bacalhau-playbook", BACBOOT_PLAYBOOK_DIR]).returncode != 0:
             logging.error("We couldn't clone the repository. Please check your internet connection and try again.")
             return_to_menu()
         logging.info("Cloned successfully!")
@@ -179,7 +824,9 @@ def begin_questionnaire(args):
     if not args.silent:
         logging.info("Let's get started! 🚀")
         logging.info("")
-    if args.unattended and not args.install == "node":
+    if args.unattended and args.install in ["client", "clients"] and args.inventory:
+        choice = "clients"
+    elif args.unattended and not args.install == "node":
         choice = "client"
     elif args.unattended and args.install == "node":
         choice = "node"
@@ -188,9 +835,9 @@ def begin_questionnaire(args):
         logging.info("")
         logging.info("(If you are upgrading Bacalhau, you can just run this install step and it will upgrade automatically!)")
         logging.info("")
-        # TODO (feat): Allow installing the bacalhau client on multiple machines without deploying nodes
         logging.info("""1) Install the Bacalhau client locally
 2) Install the Bacalhau client and setup Bacalhau node(s)
+3) Install the Bacalhau client on remote machines (without setting up nodes)
 """)
         choice = input("Enter your choice or enter 'q' to quit without making any further changes: ")
     # User wants to install just the client.
@@ -199,54 +846,51 @@ def begin_questionnaire(args):
             logging.info("Installing the Bacalhau client...")
         # If we know we have a specific version already, or the user is running in unattended mode, don't bother printing the related help text and just jump in.
         if args.version or args.unattended:
-            if args.version:
-                version = args.version
-            if args.unattended:
-                version = ""
+            version = args.version or ""
         else:
             logging.info("We don't really need to know anything to proceed, unless you want to install a specific version of Bacalhau!")
             logging.info("Press [ENTER] to proceed, or enter a version number to install a specific version of Bacalhau.")
             logging.info("")
             logging.info("(If you're confused or don't know what to do here, just press ENTER!)")
             version = input("Enter a version number or press [ENTER] to proceed: ")
-        if version == "" or version == "latest":
-            # Set bacalhau_version to "latest" as we do not actually have a custom version specified.
-            bacalhau_version = "latest"
-            # Let's make sure that we undo any changes to the overrides file that might have been made previously.
-            overrides_file = "/tmp/bacalhau-ansible/vars/overrides.yml"
-            if os.path.exists(overrides_file):
-                # Modify the overrides file to set the bacalhau_version variable
-                command = f"sed -i.bak -e 's/^bacalhau_version:.*/bacalhau_version: \"{bacalhau_version}\"/' {overrides_file} && rm {overrides_file}.bak"
-                os.system(command)
-            # Now that we have applied the correct overrides, let's proceed!
-            run_ansible_playbook("bacalhau-client.yml", args, inventory="localhost")
-        else:
-            # Modify /tmp/bacalhau-ansible/vars/overrides.yml to install a specific version of Bacalhau
-            # We'll do that by setting the variable "bacalhau_version" to the version number the user entered.
-            overrides_file = "/tmp/bacalhau-ansible/vars/overrides.yml"
-            bacalhau_version = version.strip()  # Remove any leading/trailing whitespace
-
-            if not os.path.exists(overrides_file):
-                # If the overrides file does not exist, copy overrides.yml.dist to create it
-                command = f"cp /tmp/bacalhau-ansible/vars/overrides.yml.dist {overrides_file}"
-                os.system(command)
-
-            # Modify the overrides file to set the bacalhau_version variable
-            command = f"sed -i.bak -e 's/^bacalhau_version:.*/bacalhau_version: \"{bacalhau_version}\"/' {overrides_file} && rm {overrides_file}.bak"
-            os.system(command)
-            # Now that we have applied the correct overrides, let's proceed!
-            run_ansible_playbook("bacalhau-client.yml", args, inventory="localhost")
+        args.version = version.strip() or "latest"
+        get_and_check_playbook(args)
+        # Set bacalhau_version in the overrides file to exactly the version we want, so the playbook doesn't have to work it out.
+        set_version_override(args, resolve_bacalhau_version(args))
+        # Now that we have applied the correct overrides, let's proceed!
+        run_ansible_playbook("bacalhau-client.yml", args, inventory="localhost")
+    # User wants the client on a bunch of machines. (--method direct does this with nothing but SSH, and never gets here.)
+    elif choice == "3" or choice == "clients":
+        while not args.inventory or not os.path.exists(args.inventory):
+            if args.inventory:
+                logging.error("Could not find the specified inventory file. Please try again.")
+            if args.unattended:
+                sys.exit(1)
+            logging.info("What inventory file would you like to use?")
+            args.inventory = os.path.abspath(input("Enter the name of or a path to the inventory file: ").strip())
+        logging.info("Installing the Bacalhau client on every host in the inventory using Ansible.")
+        logging.info("(To copy it over SSH instead, without Ansible, run BacBoot with --method direct.)")
+        args.version = (args.version or "latest").strip() or "latest"
+        get_and_check_playbook(args)
+        set_version_override(args, resolve_bacalhau_version(args))
+        run_ansible_playbook("bacalhau-client.yml", args, inventory=args.inventory)
     # User wants to install a node.
     elif choice == "2" or choice in ["node", "nodes"]:
         logging.info("Installing Bacalhau node(s)...")
-        logging.info("Are you installing a Bacalhau node locally, or remotely installing node(s)?")
-        logging.info("")
-        logging.info("""1) Local node
+        if args.unattended:
+            # An inventory means remote nodes. Without one, the only place we can install a node is right here.
+            choice = "2" if args.inventory else "1"
+        else:
+            logging.info("Are you installing a Bacalhau node locally, or remotely installing node(s)?")
+            logging.info("")
+            logging.info("""1) Local node
 2) Remote node(s)
 """)
-        choice = input("Enter your choice or enter 'q' to quit without making any further changes: ")
+            choice = input("Enter your choice or enter 'q' to quit without making any further changes: ")
         if choice == "1":
             logging.info("Installing a Bacalhau node locally...")
+            get_and_check_playbook(args)
+            set_version_override(args, resolve_bacalhau_version(args))
             run_ansible_playbook("bacalhau-node.yml", args, inventory="localhost")
         elif choice == "2":
             logging.info("Installing Bacalhau node(s) remotely...")
@@ -259,9 +903,8 @@ def begin_questionnaire(args):
                     args.inventory = os.getcwd() + "/" + args.inventory
                 else: 
                     logging.error("Could not find the specified inventory file. Please try again.")
-                logging.error("You must specify an absolute path to the inventory file with the --inventory flag to use this feature.")
-                logging.error("Please use an absolute path instead and try again. Exiting...")
-                sys.exit(1)
+                    logging.error("You can also specify an absolute path to the inventory file with the --inventory flag. Exiting...")
+                    sys.exit(1)
             # If the user did not specify an inventory file, ask them for one.
             elif not args.inventory:
                 while True:
@@ -278,16 +921,22 @@ def begin_questionnaire(args):
                             args.inventory = ""
                     else:
                         break
-                logging.info("Using inventory file: " + args.inventory)
+            logging.info("Using inventory file: " + args.inventory)
+            if args.unattended:
+                install_local_node = "n"
+            else:
                 install_local_node = input("Would you also like to install the Bacalhau client on the machine running BacBoot? (y/n) ")
-                get_and_check_playbook(args)
-                logging.info("We'll now run the playbook. Thanks for being patient with us! 🙏")
-                if install_local_node == "y":
-                    logging.info("Installing the Bacalhau client on the machine running BacBoot...")
-                    run_ansible_playbook("bacalhau-client.yml", args, inventory="localhost")
-                logging.info("")
-                run_ansible_playbook("bacalhau-node.yml", args, inventory=args.inventory)
-            return_to_menu()
+            get_and_check_playbook(args)
+            # Every host gets exactly the same version, even if a new release comes out halfway through.
+            set_version_override(args, resolve_bacalhau_version(args))
+            logging.info("We'll now run the playbook. Thanks for being patient with us! 🙏")
+            if install_local_node == "y":
+                logging.info("Installing the Bacalhau client on the machine running BacBoot...")
+                run_ansible_playbook("bacalhau-client.yml", args, inventory="localhost")
+            logging.info("")
+            run_ansible_playbook("bacalhau-node.yml", args, inventory=args.inventory)
+            if not args.unattended:
+                return_to_menu()
         elif choice == "q":
             logging.error("You chose not to do anything. Returning to the main menu...")
             args.install = None
@@ -305,6 +954,27 @@ def begin_questionnaire(args):
 
 
 # Ansible automation
+# Ansible's JSON output comes from the ansible.posix collection, which plain ansible-core doesn't include.
+# Whether it's installed, or None until we've checked.
+ansible_posix_available = None
+
+def ansible_json_env(install=False):
+    # Return the environment to run ansible-playbook with so it reports back in JSON, or None if ansible.posix isn't
+    # installed, and Ansible will print its usual output instead. With install, install ansible.posix if it's missing:
+    # a dry run needs the report to tell you anything, but a real run only uses it to time tasks, which can wait.
+    global ansible_posix_available
+    if ansible_posix_available is None:
+        listed = run_command(["ansible-galaxy", "collection", "list", "ansible.posix"], capture=True)
+        ansible_posix_available = listed.returncode == 0 and "ansible.posix" in listed.stdout
+    if install and not ansible_posix_available:
+        logging.info("Installing the ansible.posix collection, so Ansible can tell us exactly what it would do...")
+        result = run_command(["ansible-galaxy", "collection", "install", "ansible.posix"])
+        ansible_posix_available = result.returncode == 0
+        if not ansible_posix_available:
+            logging.warning("We couldn't install ansible.posix, so we'll have to go without a detailed report from Ansible.")
+            log_process_failure(result)
+    return dict(os.environ, ANSIBLE_STDOUT_CALLBACK="ansible.posix.json") if ansible_posix_available else None
+
 def run_ansible_playbook(playbook, args, inventory, extraopts=None):
     # Run ansible-galaxy install -r requirements.yml
     if playbook == "bacalhau-client.yml":
@@ -313,28 +983,60 @@ def run_ansible_playbook(playbook, args, inventory, extraopts=None):
         pass
     if playbook == "bacalhau-node.yml":
         logging.info("First, we'll run ansible-galaxy and install any required modules...")
-        if subprocess.run(["ansible-galaxy", "install", "-r", "/tmp/bacalhau-ansible/requirements.yml"], stdout=subprocess.DEVNULL).returncode != 0:
+        galaxy = run_command(["ansible-galaxy", "install", "-r", os.path.join(BACBOOT_PLAYBOOK_DIR, "requirements.yml")])
+        if galaxy.returncode != 0:
             logging.error("We couldn't install the required Ansible roles and collections. Please check your internet connection and try again.")
+            log_process_failure(galaxy)
             return_to_menu()
     elif playbook == "cloud.yml":
         # Install the cloud-specific requirements.
-        if subprocess.run(["ansible-galaxy", "install", "-r", "/tmp/bacalhau-ansible/requirements-cloud.yml"], stdout=subprocess.DEVNULL).returncode != 0:
+        galaxy = run_command(["ansible-galaxy", "install", "-r", os.path.join(BACBOOT_PLAYBOOK_DIR, "requirements-cloud.yml")])
+        if galaxy.returncode != 0:
             logging.error("We couldn't install the required Ansible roles and collections. Please check your internet connection and try again.")
+            log_process_failure(galaxy)
             return_to_menu()
     else:
         logging.warning("Couldn't figure out which specific requirements file to load, so using the generic one.")
-        if subprocess.run(["ansible-galaxy", "install", "-r", "/tmp/bacalhau-ansible/requirements.yml"], stdout=subprocess.DEVNULL).returncode != 0:
+        galaxy = run_command(["ansible-galaxy", "install", "-r", os.path.join(BACBOOT_PLAYBOOK_DIR, "requirements.yml")])
+        if galaxy.returncode != 0:
             logging.error("We couldn't install the required Ansible roles and collections. Please check your internet connection and try again.")
+            log_process_failure(galaxy)
             return_to_menu()
     
     # Set final inventory path based on user input
     if inventory == "localhost":
-        final_inventory_path = "/tmp/bacalhau-ansible/inventory"
+        final_inventory_path = os.path.join(BACBOOT_PLAYBOOK_DIR, "inventory")
     else:
         final_inventory_path = inventory
+    # For remote machines, fetch and pin their host keys up front, and have Ansible trust the pinned keys.
+    ssh_args = []
+    # The same hosts Ansible will see, whatever format the inventory is in (or None if we can't tell).
+    parsed_inventory = load_inventory(final_inventory_path) if inventory != "localhost" else None
+    if inventory == "localhost":
+        hosts = [{"name": "localhost", "vars": {"ansible_connection": "local"}}]
+    else:
+        hosts = inventory_hosts(parsed_inventory) if parsed_inventory else []
+    if not check_throttle_limits(args, hosts, bandwidth_ignored="Ansible has each host download Bacalhau itself"):
+        return_to_menu()
+    throttled = throttle_requested(args, hosts)
+    if parsed_inventory is None and inventory != "localhost" and (args.max_hosts_per_group or args.max_load is not None or args.max_running_jobs is not None):
+        logging.error("We couldn't read the host list, so we can't stick to --max-hosts-per-group, --max-load or --max-running-jobs.")
+        return_to_menu()
+    if inventory != "localhost":
+        ssh_args = ["--ssh-common-args", "-o " + shlex.quote(known_hosts_option())]
+        if parsed_inventory is None:
+            logging.warning("We'll leave checking the hosts' SSH host keys to Ansible.")
+            unusable_hosts = []
+        else:
+            unusable_hosts = prefetch_host_keys(args, hosts)
+        if unusable_hosts and not args.unattended:
+            logging.info("Press [ENTER] to run the playbook anyway (those hosts will fail), or enter anything else to abort.")
+            if input() != "":
+                logging.error("Aborting...")
+                return_to_menu()
     logging.info("Now, let's run the playbook!")
     logging.info("We'll run it with the following command:")
-    logging.info("ansible-playbook -i " + final_inventory_path + " /tmp/bacalhau-ansible/" + playbook)
+    logging.info("ansible-playbook -i " + final_inventory_path + " " + os.path.join(BACBOOT_PLAYBOOK_DIR, playbook))
     if args.unattended:
         # We are running unattended, so we'll assume the user doesn't want to run with --ask-become-pass if they haven't explicitly specified that.
         if not args.ask_become_pass:
@@ -358,30 +1060,67 @@ def run_ansible_playbook(playbook, args, inventory, extraopts=None):
                 continue
             break
     # Run the playbook
+    command = ["ansible-playbook", "--become", "-i", final_inventory_path, os.path.join(BACBOOT_PLAYBOOK_DIR, playbook), "--forks", str(args.forks)] + ssh_args
     if args.ask_become_pass:
-        if subprocess.run(["ansible-playbook", "--become", "--ask-become-pass", "-i", final_inventory_path, "/tmp/bacalhau-ansible/" + playbook], stdout=subprocess.DEVNULL).returncode != 0:
+        command.insert(2, "--ask-become-pass")
+    if args.dry_run:
+        command += ["--check", "--diff"]
+        if dry_run_version:
+            command += ["--extra-vars", json.dumps({"bacalhau_version": dry_run_version})]
+    # Have Ansible report back in JSON if we can, so we can see exactly what happened on each host and how long it took.
+    env = ansible_json_env(install=args.dry_run)
+    # Without a host list, there's nothing to split into batches, so every host goes at once.
+    if args.batch_size and inventory != "localhost" and parsed_inventory is None:
+        logging.warning("We couldn't read the host list, so --batch-size is ignored and every host goes at once.")
+    # A dry run looks at every host at once. A real run can go through the hosts a batch at a time,
+    # and has to if any of them have rollout limits.
+    batched = not args.dry_run and hosts and (throttled or (args.batch_size and len(hosts) > args.batch_size))
+    batches = ansible_batches(args, hosts) if batched else [None]
+    reports, ran = [], 0
+    for batch_number, batch in enumerate(batches, start=1):
+        limit = []
+        if batch:
+            ran += len(batch)
+            logging.info(f"Running batch {batch_number} ({len(batch)} host(s), {len(hosts) - ran} to go after it)...")
+            # This machine is the only host in our own inventory, so there's nothing to limit.
+            if inventory != "localhost":
+                limit = ["--limit", ",".join(host["name"] for host in batch)]
+        process = run_command(command + limit, capture=bool(env), interactive=args.ask_become_pass, env=env)
+        # Only keep all of Ansible's output when it's the JSON report. Otherwise the tail is enough for error messages.
+        report = parse_playbook_output(process.stdout) if env else None
+        if report:
+            reports.append(report)
+        if process.returncode != 0:
+            if args.dry_run and report:
+                # Failures in check mode are worth reporting, but they don't mean anything was broken.
+                break
             logging.error("We couldn't run the playbook, or it didn't succeed. If you are accessing a remote machine, please check your network connection and permissions and try again.")
-            logging.error("You'll especially want to check that you can access the remote machine using your SSH keys, that you have accepted the machine's host keys...")
+            logging.error("You'll especially want to check that you can access the remote machine using your SSH keys, that we could fetch the machine's host keys...")
             logging.error("and that you have sudo/become permissions if needed.")
             logging.error("")
             logging.error("(If you are feeling particularly adventurous - and be careful if you are - run the playbook by hand to see what's wrong.")
             logging.error("Feel free to ask for help if you take this route! 🙏)")
-            return_to_menu()
-    else:
-        if subprocess.run(["ansible-playbook", "--become", "-i", final_inventory_path, "/tmp/bacalhau-ansible/" + playbook], stdout=subprocess.DEVNULL).returncode != 0:
-            logging.error("We couldn't run the playbook. If you are accessing a remote machine, please check your network connection and permissions and try again.")
-            logging.error("You'll especially want to check that you can access the remote machine using your SSH keys, that you have accepted the machine's host keys...")
-            logging.error("and that you have sudo/become permissions if needed.")
             logging.error("")
-            logging.error("(If you are feeling particularly adventurous - and be careful if you are - run the playbook by hand to see what's wrong.")
-            logging.error("Feel free to ask for help if you take this route! 🙏)")
+            logging.error("Here's the end of what Ansible had to say:")
+            log_process_failure(process)
             return_to_menu()
+    if batched and ran < len(hosts):
+        logging.error(f"We left {len(hosts) - ran} busy host(s) alone. Please run BacBoot again once they're less busy.")
+        return_to_menu()
+
+    if args.dry_run:
+        if reports:
+            summarize_dry_run(args, playbook, reports[0], len(hosts) if parsed_inventory else len(reports[0].get("stats", {})))
+        else:
+            logging.error("We couldn't make sense of Ansible's output, so we can't tell you what would change. Sorry!")
+        return
+    record_task_timings(args, playbook, reports)
+    # The playbook may well have installed things (like the Bacalhau client) on this machine.
+    forget_prerequisites()
 
     if args.unattended:
         # We're running in unattended mode, and we're pretty sure we succeeded, so let us simply continue.
         logging.info("We believe we ran that playbook successfully. Continuing as we are in unattended mode.")
-        time.sleep(3)
-        pass
     else:
         logging.info("We believe we ran that playbook successfully. Check it out, then press [ENTER] to continue or any other key to abort.")
         choice = input()
@@ -392,6 +1131,113 @@ def run_ansible_playbook(playbook, args, inventory, extraopts=None):
             return_to_menu()
     # TODO (bug): If we remove Ansible, we should remove the playbook too!
 
+# Playbook reporting, dry runs and time estimates
+# Per-task timings from real runs, used to estimate how long the next one will take.
+TASK_TIMINGS_FILE = os.path.join(BACBOOT_CACHE_DIR, "task-timings.json")
+
+def parse_playbook_output(output):
+    # Pull the JSON report out of Ansible's output, skipping anything printed before it.
+    try:
+        return json.loads(output[output.index("{"):])
+    except ValueError:
+        return None
+
+def playbook_tasks(report):
+    # Yield (task name, seconds taken, {host: result}) for every task in a JSON playbook report, in order.
+    import datetime
+    def timestamp(value):
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    for play in report.get("plays", []):
+        for task in play.get("tasks", []):
+            name = f"{play['play'].get('name', '')}: {task['task'].get('name', '')}"
+            duration = task["task"].get("duration", {})
+            try:
+                seconds = (timestamp(duration["end"]) - timestamp(duration["start"])).total_seconds()
+            except (KeyError, ValueError):
+                seconds = 0.0
+            yield name, seconds, task.get("hosts", {})
+
+def load_task_timings():
+    try:
+        with open(TASK_TIMINGS_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def record_task_timings(args, playbook, reports):
+    # Remember how long each task took per "wave" of hosts (as many hosts as Ansible runs at once),
+    # which lets us scale the numbers to any number of hosts and --forks later on.
+    timings = load_task_timings()
+    recorded = timings.setdefault(playbook, {})
+    for report in reports:
+        waves = math.ceil(max(len(report.get("stats", {})), 1) / args.forks)
+        for name, seconds, _ in playbook_tasks(report):
+            entry = recorded.setdefault(name, {"seconds_per_wave": 0.0, "runs": 0})
+            # Average over the last few runs, so one slow mirror doesn't skew every estimate forever.
+            weight = min(entry["runs"], 9)
+            entry["seconds_per_wave"] = (entry["seconds_per_wave"] * weight + seconds / waves) / (weight + 1)
+            entry["runs"] += 1
+    try:
+        os.makedirs(BACBOOT_CACHE_DIR, exist_ok=True)
+        with open(TASK_TIMINGS_FILE + ".tmp", "w") as f:
+            json.dump(timings, f, indent=2)
+        os.replace(TASK_TIMINGS_FILE + ".tmp", TASK_TIMINGS_FILE)
+    except OSError as e:
+        logging.warning(f"We couldn't save how long the playbook took, so future estimates won't include this run: {e}")
+
+def estimate_playbook_duration(args, playbook, report, host_count):
+    # Estimate how long a real run would take, returning (seconds, number of tasks we had to guess at).
+    # Tasks we've timed before use those timings. Anything new falls back to how long it took in check mode.
+    recorded = load_task_timings().get(playbook, {})
+    check_tasks = {name: seconds for name, seconds, _ in playbook_tasks(report)}
+    check_waves = math.ceil(max(host_count, 1) / args.forks)
+    batch_size = min(args.batch_size or host_count, host_count) or 1
+    batches = math.ceil(max(host_count, 1) / batch_size)
+    waves = math.ceil(batch_size / args.forks)
+    per_batch, guessed = 0.0, 0
+    for name in list(recorded) + [name for name in check_tasks if name not in recorded]:
+        if name in recorded:
+            per_batch += recorded[name]["seconds_per_wave"] * waves
+        else:
+            per_batch += check_tasks[name] / check_waves * waves
+            guessed += 1
+    return per_batch * batches, guessed
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+def summarize_dry_run(args, playbook, report, host_count):
+    # Tell the user what the playbook would have changed on each host, and how long doing it for real should take.
+    import difflib
+    changes = {}
+    for name, _, results in playbook_tasks(report):
+        for host, result in results.items():
+            if result.get("changed"):
+                changes.setdefault(host, []).append((name, result.get("diff")))
+    logging.warning("Dry run summary (nothing has actually been changed):")
+    for host, stats in sorted(report.get("stats", {}).items()):
+        problems = stats.get("failures", 0) + stats.get("unreachable", 0)
+        logging.warning(f"  {host}: {stats.get('changed', 0)} change(s), {stats.get('ok', 0)} ok, {problems} failed or unreachable")
+        for name, diffs in changes.get(host, []):
+            logging.info(f"    ~ {name}")
+            for diff in (diffs if isinstance(diffs, list) else [diffs] if diffs else []):
+                if isinstance(diff.get("before"), str) and isinstance(diff.get("after"), str):
+                    lines = list(difflib.unified_diff(diff["before"].splitlines(), diff["after"].splitlines(),
+                        diff.get("before_header", "before"), diff.get("after_header", "after"), lineterm=""))
+                    for line in lines[:20]:
+                        logging.info(f"        {line}")
+                    if len(lines) > 20:
+                        logging.info(f"        ... and {len(lines) - 20} more line(s)")
+    seconds, guessed = estimate_playbook_duration(args, playbook, report, host_count)
+    batching = f"batches of {args.batch_size}, " if args.batch_size else ""
+    logging.warning(f"Estimated time for the real run on {host_count} host(s) ({batching}{args.forks} forks): about {format_duration(seconds)}.")
+    if guessed:
+        logging.warning(f"({guessed} task(s) haven't been timed in a real run yet, so we went by how long they took in this dry run. The real thing will probably take longer.)")
+
 def print_install_options():
     logging.info("In order to install Bacalhau safely and cleanly, we're going to need a few prerequisites.")
     log_wrapped("BacBoot is primarily powered by Ansible, but it's also good for deploying Bacalhau on Docker, driving Terraform or deploying in the cloud. What would you like to do?")
@@ -401,7 +1247,7 @@ def print_install_options():
     log_wrapped("Also, this installer can even remove Ansible afterwards if you don't want to have it long term!")
     logging.info("""
 1) Install Bacalhau using Ansible
-2) Install Bacalhau using Docker (UNIMPLEMENTED)
+2) Install Bacalhau using Docker
 3) Install Bacalhau in the cloud using Ansible (UNIMPLEMENTED)
 4) Install Bacalhau in the cloud using Terraform + Ansible (UNIMPLEMENTED)
 """)
@@ -435,6 +1281,516 @@ def install_using_ansible(args):
 
     logging.info("")
 
+BACALHAU_DOCKER_IMAGE = "ghcr.io/bacalhau-project/bacalhau"
+
+def bacalhau_docker_image(version):
+    # Turn a version like "1.0.3" or "latest" into the matching Bacalhau image reference.
+    if version in ["", "latest"]:
+        return BACALHAU_DOCKER_IMAGE + ":latest"
+    version = version.strip()
+    return BACALHAU_DOCKER_IMAGE + ":" + (version if version.startswith("v") else "v" + version)
+
+def docker_node_command(image):
+    # (Re)create the Bacalhau node container from the given image, keeping the node's data between upgrades.
+    return (
+        f"docker rm -f bacalhau >/dev/null 2>&1; "
+        f"docker run -d --name bacalhau --restart unless-stopped --network host "
+        f"-v /var/run/docker.sock:/var/run/docker.sock -v /root/.bacalhau:/root/.bacalhau {image} serve"
+    )
+
+async def distribute_docker_image(args, hosts, image, mirror_image, tarball):
+    # Load the image onto every host at once (up to --forks at a time, and within any rollout limits), from our mirror rather than the internet.
+    import asyncio
+    throttle = new_throttle(args)
+    port = args.docker_mirror_port
+    async def distribute(host, bucket):
+        if is_local_host(host):
+            # We pulled the image right here, so there's nothing to send.
+            command, ssh_options, stdin_path = "true", None, None
+        elif tarball:
+            command, ssh_options, stdin_path = "docker load", None, tarball
+        else:
+            # Tunnel our registry to the host's own localhost, which Docker trusts without TLS.
+            # Docker only fetches the layers the host doesn't have yet, so upgrades are cheap.
+            command = f"docker pull -q localhost:{port}/{mirror_image} && docker tag localhost:{port}/{mirror_image} {image} && docker rmi localhost:{port}/{mirror_image} >/dev/null"
+            ssh_options, stdin_path = ["-o", "ExitOnForwardFailure=yes", "-R", f"{port}:127.0.0.1:{port}"], None
+        if args.install == "node":
+            command += " && { " + docker_node_command(image) + "; }"
+        # (The registry tunnel is Docker's own connection, so only tarballs can be throttled.)
+        argv = remote_command(args, host, command, ssh_options)
+        result = await run_process(argv, **(throttled_input(bucket, argv, path=stdin_path) if stdin_path else {}))
+        if result.returncode == 0:
+            logging.info(f"{host['name']}: ready ✅")
+        else:
+            logging.error(f"{host['name']}: failed ❌ {result.stderr.strip()}")
+        return result.returncode == 0
+    async def distribute_throttled(host):
+        return bool(await run_throttled(args, throttle, host, lambda bucket: distribute(host, bucket)))
+    return await asyncio.gather(*[distribute_throttled(host) for host in hosts])
+
+def install_using_docker(args):
+    import asyncio
+    if not args.silent:
+        logging.info("Awesome, let's get started with Docker!")
+        log_wrapped("We'll pull the Bacalhau image once on this machine, then hand it out to every host from here, so your hosts don't each have to download it from the internet.")
+        logging.info("")
+    if not check_if_docker_installed(args):
+        logging.error("We need Docker installed on this machine to continue. Please install Docker and try again.")
+        return_to_menu()
+        return False
+    image = bacalhau_docker_image(resolve_bacalhau_version(args))
+    hosts = load_target_hosts(args, groups=["bacalhau_node"] if args.install == "node" else ["bacalhau_client"])
+    registry_only = "with --docker-mirror registry, hosts pull the image over Docker's own connection" if args.docker_mirror == "registry" else None
+    if not check_throttle_limits(args, hosts, bandwidth_ignored=registry_only):
+        return_to_menu()
+        return False
+    logging.info(f"Pulling {image}...")
+    pull = run_command(["docker", "pull", "-q", image])
+    if pull.returncode != 0:
+        logging.error("We couldn't pull the Bacalhau image. Please check your internet connection and try again.")
+        log_process_failure(pull)
+        return_to_menu()
+        return False
+
+    unusable_hosts = prefetch_host_keys(args, hosts)
+    hosts = [host for host in hosts if host["name"] not in unusable_hosts]
+    remote_hosts = [host for host in hosts if not is_local_host(host)]
+    mirror_image = "bacalhau:" + image.rsplit(":", 1)[1]
+    tarball = None
+    if remote_hosts and args.docker_mirror == "tarball":
+        # An exported image can be streamed to hosts that can't reach a registry at all, but it is always sent in full.
+        os.makedirs(BACBOOT_CACHE_DIR, exist_ok=True)
+        tarball = os.path.join(BACBOOT_CACHE_DIR, mirror_image.replace(":", "-") + ".tar")
+        logging.info(f"Exporting the image to {tarball}...")
+        save = run_command(["docker", "save", "-o", tarball, image])
+        if save.returncode != 0:
+            logging.error("We couldn't export the Bacalhau image.")
+            log_process_failure(save)
+            return_to_menu()
+            return False
+    elif remote_hosts:
+        # Keep the registry's storage in a volume, so the next upgrade only has to push the layers that changed.
+        logging.info("Starting a temporary registry to share the image with your hosts...")
+        run_command(["docker", "rm", "-f", "bacboot-registry"])
+        registry = run_command(["docker", "run", "-d", "--name", "bacboot-registry", "-p", f"127.0.0.1:{args.docker_mirror_port}:5000",
+                                "-v", "bacboot-registry:/var/lib/registry", "registry:2"])
+        if registry.returncode != 0:
+            logging.error("We couldn't start a local registry. Try --docker-mirror tarball instead.")
+            log_process_failure(registry)
+            return_to_menu()
+            return False
+        local_mirror_image = f"localhost:{args.docker_mirror_port}/{mirror_image}"
+        run_command(["docker", "tag", image, local_mirror_image])
+        # The registry needs a moment to start listening, so give the push a few tries.
+        for attempt in range(10):
+            if run_command(["docker", "push", "-q", local_mirror_image]).returncode == 0:
+                break
+            time.sleep(1)
+        else:
+            logging.error("We couldn't push the image to our local registry.")
+            run_command(["docker", "rm", "-f", "bacboot-registry"])
+            return_to_menu()
+            return False
+
+    try:
+        logging.info(f"Getting the image onto {len(hosts)} host(s)...")
+        results = asyncio.run(distribute_docker_image(args, hosts, image, mirror_image, tarball))
+    finally:
+        if remote_hosts and not tarball:
+            run_command(["docker", "rm", "-f", "bacboot-registry"])
+    failures = results.count(False) + len(unusable_hosts)
+    if failures:
+        logging.error(f"We couldn't install Bacalhau on {failures} of {len(hosts) + len(unusable_hosts)} host(s). Please check the errors above and try again.")
+        return_to_menu()
+        return False
+    if args.install != "node" and not args.silent:
+        logging.info(f"You can now run the Bacalhau client with: docker run --rm {image} version")
+    return True
+
+BACALHAU_RELEASE_API = "https://api.github.com/repos/bacalhau-project/bacalhau/releases/latest"
+BACALHAU_RELEASE_DOWNLOAD = "https://github.com/bacalhau-project/bacalhau/releases/download/{version}/bacalhau_{version}_linux_{arch}.tar.gz"
+# Map what `uname -m` says to the architecture names Bacalhau releases use.
+BACALHAU_ARCHITECTURES = {"x86_64": "amd64", "amd64": "amd64", "aarch64": "arm64", "arm64": "arm64", "armv7l": "armv7", "armv6l": "armv6"}
+
+# What "latest" turned out to mean during this run, by release API.
+latest_releases = {}
+
+def resolve_latest_version(args):
+    # Find out which release "latest" currently is. We only ask once per run, and remember the answer
+    # on disk for --release-cache-ttl seconds, so back to back runs don't keep asking either.
+    if args.release_api in latest_releases:
+        return latest_releases[args.release_api]
+    cache_path = os.path.join(BACBOOT_CACHE_DIR, "latest-release.json")
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+        # Anything that isn't exactly what we wrote (a damaged or hand-edited file) counts as a miss.
+        if (cached["api"] == args.release_api and isinstance(cached["version"], str) and cached["version"]
+                and 0 <= time.time() - cached["fetched"] < args.release_cache_ttl):
+            latest_releases[args.release_api] = cached["version"]
+            return cached["version"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # No usable cache, so we'll just ask.
+        pass
+    import urllib.request
+    with urllib.request.urlopen(args.release_api, timeout=30) as response:
+        release = json.load(response)
+    version = release.get("tag_name") if isinstance(release, dict) else None
+    if not isinstance(version, str) or not version:
+        raise ValueError("the release API didn't say which version is the latest")
+    latest_releases[args.release_api] = version
+    try:
+        os.makedirs(BACBOOT_CACHE_DIR, exist_ok=True)
+        with open(cache_path + ".tmp", "w") as f:
+            json.dump({"api": args.release_api, "version": version, "fetched": time.time()}, f)
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError as e:
+        logging.warning(f"We couldn't remember which release is the latest, so we'll ask again next time: {e}")
+    return version
+
+def resolve_bacalhau_version(args, fallback="latest"):
+    # Work out the release tag to hand to every host, turning "latest" into an actual release, so every host gets the same one.
+    # If we can't find out what "latest" is right now, return fallback: by default "latest" itself, which leaves each host
+    # to work it out for itself like we used to. With fallback=None, raise instead, for when we need the real thing.
+    version = (args.version or "latest").strip()
+    if version not in ["", "latest"]:
+        return version if version.startswith("v") else "v" + version
+    try:
+        version = resolve_latest_version(args)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if fallback is None:
+            raise
+        logging.warning(f"We couldn't find out which version of Bacalhau is the latest ({e}), so each host will check for itself.")
+        return fallback
+    logging.info(f"The latest version of Bacalhau is {version}. We'll install exactly that everywhere.")
+    return version
+
+# The version a dry run would pin, passed straight to Ansible instead of being written to the overrides file.
+dry_run_version = None
+
+def set_version_override(args, version):
+    # Set bacalhau_version in the playbook's overrides file, creating it from overrides.yml.dist if needed.
+    global dry_run_version
+    if args.dry_run:
+        dry_run_version = version
+        return
+    overrides_file = os.path.join(BACBOOT_PLAYBOOK_DIR, "vars", "overrides.yml")
+    if not os.path.isdir(os.path.dirname(overrides_file)):
+        logging.warning("We don't have a copy of the playbook yet, so we can't choose which version it installs.")
+        return
+    lines = []
+    for path in [overrides_file, overrides_file + ".dist"]:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                lines = f.readlines()
+            break
+    setting = f"bacalhau_version: \"{version}\"\n"
+    if any(line.startswith("bacalhau_version:") for line in lines):
+        lines = [setting if line.startswith("bacalhau_version:") else line for line in lines]
+    else:
+        lines.append(setting)
+    with open(overrides_file, "w") as f:
+        f.writelines(lines)
+
+def download_bacalhau_binary(version, arch):
+    # Download and unpack a Bacalhau release once, keeping it around for next time.
+    binary_path = os.path.join(BACBOOT_CACHE_DIR, f"bacalhau-{version}-linux-{arch}")
+    if not os.path.exists(binary_path):
+        os.makedirs(BACBOOT_CACHE_DIR, exist_ok=True)
+        logging.info(f"Downloading Bacalhau {version} for linux/{arch}...")
+        archive_path = binary_path + ".tar.gz"
+        import tarfile, urllib.request
+        urllib.request.urlretrieve(BACALHAU_RELEASE_DOWNLOAD.format(version=version, arch=arch), archive_path)
+        try:
+            with tarfile.open(archive_path) as archive:
+                member = archive.getmember("bacalhau")
+                with archive.extractfile(member) as source, open(binary_path + ".tmp", "wb") as destination:
+                    destination.write(source.read())
+        except tarfile.TarError as e:
+            raise OSError(f"the release archive is damaged ({e})")
+        os.chmod(binary_path + ".tmp", 0o755)
+        os.replace(binary_path + ".tmp", binary_path)
+        os.remove(archive_path)
+    return binary_path
+
+def sha256_file(path):
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ssh_multiplex_options():
+    # Share one SSH connection per host between all the commands we send it, instead of reconnecting every time.
+    return ["-o", "ControlMaster=auto", "-o", "ControlPath=" + os.path.expanduser("~/.ssh/bacboot-%C"), "-o", "ControlPersist=300"]
+
+def sudo_script(script):
+    # Run a script as root on the remote host, using passwordless sudo if we didn't log in as root.
+    return f'if [ "$(id -u)" -eq 0 ]; then sh -c {shlex.quote(script)}; else sudo -n sh -c {shlex.quote(script)}; fi'
+
+async def probe_client_hosts(args, hosts):
+    # Find out each host's architecture, the checksum of any Bacalhau binary it already has, and whether it has Python
+    # (which we need to rebuild the binary from a delta).
+    import asyncio
+    semaphore = asyncio.Semaphore(args.forks)
+    path = shlex.quote(args.client_path)
+    script = f"uname -m; (sha256sum {path} 2>/dev/null || echo none) | cut -d ' ' -f 1; command -v python3 >/dev/null 2>&1 && echo python3 || echo none"
+    async def probe(host):
+        async with semaphore:
+            result = await run_process(remote_command(args, host, script, ssh_multiplex_options()), capture=True)
+            if result.returncode != 0:
+                logging.error(f"{host['name']}: couldn't connect ❌ {result.stderr.strip()}")
+                return host["name"], None
+            arch, checksum, python = (result.stdout.split() + ["none", "none"])[:3]
+            return host["name"], {"arch": BACALHAU_ARCHITECTURES.get(arch, arch), "checksum": checksum, "python": python == "python3"}
+    return dict(await asyncio.gather(*[probe(host) for host in hosts]))
+
+async def push_binary(args, host, binary_path, checksum, bucket=None):
+    # Stream the binary to the host over its existing SSH connection, check it arrived intact, then move it into place.
+    install_script = (
+        'new="$0.bacboot-new.$$"; cat > "$new" && chmod 0755 "$new" && '
+        '[ "$(sha256sum < "$new" | cut -d " " -f 1)" = "$1" ] && mv -f "$new" "$0" '
+        '|| { rm -f "$new"; exit 1; }'
+    )
+    command = sudo_script(f"sh -c {shlex.quote(install_script)} {shlex.quote(args.client_path)} {checksum}")
+    argv = remote_command(args, host, command, ssh_multiplex_options())
+    result = await run_process(argv, **throttled_input(bucket, argv, path=binary_path))
+    return result.returncode == 0, result.stderr.strip()
+
+# Delta upgrades, rsync style. The host describes the binary it already has as a list of block checksums,
+# we work out which blocks of the new binary it already has, and send only the rest plus instructions to put them together.
+# The weak checksum is Adler-32, which zlib computes for us on the host and which we can roll along the new binary cheaply.
+DELTA_SIGNATURE_SCRIPT = """
+import hashlib, sys, zlib
+path, size = sys.argv[1], int(sys.argv[2])
+with open(path, "rb") as f:
+    for block in iter(lambda: f.read(size), b""):
+        if len(block) == size:
+            print(zlib.adler32(block), hashlib.blake2b(block, digest_size=16).hexdigest())
+"""
+DELTA_REBUILD_SCRIPT = """
+import hashlib, os, struct, sys
+old, target, expected, size = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+new = "%s.bacboot-new.%d" % (target, os.getpid())
+stdin = sys.stdin.buffer
+digest = hashlib.sha256()
+try:
+    with open(old, "rb") as source, open(new, "wb") as out:
+        while True:
+            op = stdin.read(1)
+            if not op:
+                break
+            if op == b"C":
+                index, count = struct.unpack(">II", stdin.read(8))
+                source.seek(index * size)
+                data = source.read(count * size)
+            else:
+                length, = struct.unpack(">I", stdin.read(4))
+                data = stdin.read(length)
+            digest.update(data)
+            out.write(data)
+    if digest.hexdigest() != expected:
+        sys.exit("The rebuilt binary doesn't match the expected checksum")
+    os.chmod(new, 0o755)
+    os.replace(new, target)
+finally:
+    if os.path.exists(new):
+        os.remove(new)
+"""
+
+def delta_block_size(size):
+    # Like rsync, use blocks of roughly the square root of the file size, which balances signature size against match quality.
+    return min(max(int(size ** 0.5) // 8 * 8, 1024), 128 * 1024)
+
+def compute_delta(binary_path, signatures, block_size):
+    # Work out the instructions for rebuilding our binary from the blocks the host already has.
+    # Returns the encoded instructions, ready to be streamed to DELTA_REBUILD_SCRIPT, or None if a delta isn't worth it.
+    # Rolling the checksum costs a few seconds of CPU per binary when nothing matches, so we give up early when the old
+    # binary is nothing like the new one: a very different size, or not one block in common in the first eighth of it.
+    import hashlib, struct, zlib
+    with open(binary_path, "rb") as f:
+        data = f.read()
+    old_length = len(signatures) * block_size
+    if not len(data) / 2 <= old_length <= len(data) * 2:
+        return None
+    give_up_at = max(len(data) // 8, 4 * block_size)
+    blocks = {}
+    for index, (weak, strong) in enumerate(signatures):
+        blocks.setdefault(weak, []).append((strong, index))
+    ops = []
+    def add_literal(start, end):
+        # Split big literals so each fits comfortably in a single record.
+        for offset in range(start, end, 1024 * 1024):
+            chunk = data[offset:min(end, offset + 1024 * 1024)]
+            ops.append(b"L" + struct.pack(">I", len(chunk)) + chunk)
+    copy = None
+    def flush_copy():
+        if copy:
+            ops.append(b"C" + struct.pack(">II", *copy))
+
+    length, position, literal_start, matched = len(data), 0, 0, False
+    if length >= block_size:
+        checksum = zlib.adler32(data[:block_size])
+        a, b = checksum & 0xffff, checksum >> 16
+    while position + block_size <= length:
+        if not matched and position >= give_up_at:
+            return None
+        candidates = blocks.get((b << 16) | a)
+        if candidates:
+            strong = hashlib.blake2b(data[position:position + block_size], digest_size=16).hexdigest()
+            index = next((index for candidate, index in candidates if candidate == strong), None)
+            if index is not None:
+                matched = True
+                if literal_start < position:
+                    flush_copy()
+                    copy = None
+                    add_literal(literal_start, position)
+                # Runs of consecutive blocks become a single copy instruction.
+                if copy and copy[0] + copy[1] == index:
+                    copy = (copy[0], copy[1] + 1)
+                else:
+                    flush_copy()
+                    copy = (index, 1)
+                position += block_size
+                literal_start = position
+                if position + block_size <= length:
+                    checksum = zlib.adler32(data[position:position + block_size])
+                    a, b = checksum & 0xffff, checksum >> 16
+                continue
+        # No match here, so roll the checksum along by one byte.
+        if position + block_size < length:
+            outgoing, incoming = data[position], data[position + block_size]
+            a = (a - outgoing + incoming) % 65521
+            b = (b - block_size * outgoing + a - 1) % 65521
+        position += 1
+    flush_copy()
+    add_literal(literal_start, length)
+    return b"".join(ops)
+
+async def build_delta(args, host, binary_path):
+    # Fetch the signatures of the binary on this host and build a delta against them.
+    import asyncio
+    block_size = delta_block_size(os.path.getsize(binary_path))
+    command = f"python3 -c {shlex.quote(DELTA_SIGNATURE_SCRIPT)} {shlex.quote(args.client_path)} {block_size}"
+    result = await run_process(remote_command(args, host, command, ssh_multiplex_options()), capture=True)
+    if result.returncode != 0:
+        logging.warning(f"{host['name']}: couldn't read the existing binary for a delta upgrade, sending it in full. {result.stderr.strip()}")
+        return None
+    signatures = [(int(weak), strong) for weak, strong in (line.split() for line in result.stdout.splitlines() if line)]
+    # Matching is CPU bound, so keep it off the event loop while other hosts carry on.
+    delta = await asyncio.to_thread(compute_delta, binary_path, signatures, block_size)
+    if delta is None:
+        logging.info(f"{host['name']}: the binary there has too little in common with the new one for a delta upgrade, sending it in full.")
+        return None
+    return delta, block_size
+
+async def push_delta(args, host, delta, block_size, checksum, bucket=None):
+    # Send the delta, and have the host rebuild and check the new binary before swapping it in.
+    script = f"python3 -c {shlex.quote(DELTA_REBUILD_SCRIPT)} {shlex.quote(args.client_path)} {shlex.quote(args.client_path)} {checksum} {block_size}"
+    argv = remote_command(args, host, sudo_script(script), ssh_multiplex_options())
+    result = await run_process(argv, **throttled_input(bucket, argv, data=delta))
+    return result.returncode == 0, result.stderr.strip()
+
+async def push_clients_async(args, hosts, probes, binaries):
+    import asyncio
+    throttle = new_throttle(args)
+    # Hosts running the same old binary can all share one delta, so we only build it once.
+    deltas = {}
+    sent = {"bytes": 0, "full": 0}
+    async def push(host):
+        probe = probes[host["name"]]
+        binary_path, checksum = binaries[probe["arch"]]
+        if probe["checksum"] == checksum:
+            logging.info(f"{host['name']}: already up to date ✅")
+            return "skipped"
+        size = os.path.getsize(binary_path)
+        sent["full"] += size
+        async def transfer(bucket):
+            delta = None
+            if args.delta and probe["checksum"] != "none" and probe["python"]:
+                key = (probe["arch"], probe["checksum"])
+                if key not in deltas:
+                    deltas[key] = asyncio.ensure_future(build_delta(args, host, binary_path))
+                delta = await deltas[key]
+            if delta:
+                success, error = await push_delta(args, host, delta[0], delta[1], checksum, bucket)
+                sent["bytes"] += len(delta[0])
+                if not success:
+                    logging.warning(f"{host['name']}: delta upgrade failed, sending the binary in full. {error}")
+            if not delta or not success:
+                success, error = await push_binary(args, host, binary_path, checksum, bucket)
+                sent["bytes"] += size
+            return success, error
+        outcome = await run_throttled(args, throttle, host, transfer)
+        if outcome is None:
+            return "deferred"
+        success, error = outcome
+        if success:
+            logging.info(f"{host['name']}: installed ✅")
+            return "installed"
+        logging.error(f"{host['name']}: failed ❌ {error}")
+        return "failed"
+    results = await asyncio.gather(*[push(host) for host in hosts])
+    if args.delta and sent["full"]:
+        logging.info(f"Sent {sent['bytes'] / 1e6:.2f} MB in total, instead of {sent['full'] / 1e6:.2f} MB without delta upgrades.")
+    return results
+
+def push_clients(args):
+    # Install the Bacalhau client on every host in the inventory with nothing more than SSH.
+    # All it takes is copying one binary, so we skip Ansible entirely and talk to lots of hosts at once.
+    import asyncio
+    hosts = load_target_hosts(args, groups=["bacalhau_client"])
+    if not check_throttle_limits(args, hosts):
+        return False
+    unusable_hosts = prefetch_host_keys(args, hosts)
+    hosts = [host for host in hosts if host["name"] not in unusable_hosts]
+    try:
+        version = resolve_bacalhau_version(args, fallback=None)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.error(f"We couldn't find out which version of Bacalhau is the latest: {e}")
+        return False
+    logging.info(f"Installing the Bacalhau {version} client on {len(hosts)} host(s)...")
+    probes = asyncio.run(probe_client_hosts(args, hosts))
+    failed = len(unusable_hosts) + sum(1 for probe in probes.values() if probe is None)
+    hosts = [host for host in hosts if probes[host["name"]]]
+
+    # Fetch each architecture we need exactly once, no matter how many hosts use it.
+    binaries = {}
+    for arch in sorted({probes[host["name"]]["arch"] for host in hosts}):
+        try:
+            binary_path = download_bacalhau_binary(version, arch)
+        except (OSError, KeyError) as e:
+            logging.error(f"We couldn't download Bacalhau {version} for linux/{arch}: {e}")
+            failed += sum(1 for host in hosts if probes[host["name"]]["arch"] == arch)
+            continue
+        binaries[arch] = (binary_path, sha256_file(binary_path))
+    hosts = [host for host in hosts if probes[host["name"]]["arch"] in binaries]
+
+    if args.dry_run:
+        # Say what we would do to each host, but leave them all exactly as they are.
+        logging.warning("Dry run summary (nothing has actually been changed):")
+        changes = 0
+        for host in hosts:
+            probe = probes[host["name"]]
+            if probe["checksum"] == binaries[probe["arch"]][1]:
+                logging.warning(f"  {host['name']}: already up to date")
+            else:
+                changes += 1
+                action = "upgrade" if probe["checksum"] != "none" else "install"
+                logging.warning(f"  {host['name']}: would {action} the Bacalhau {version} client at {args.client_path}")
+        logging.warning(f"{changes} of {len(hosts)} host(s) would change.")
+        return failed == 0
+
+    results = asyncio.run(push_clients_async(args, hosts, probes, binaries))
+    forget_prerequisites()
+    failed += results.count("failed")
+    deferred = results.count("deferred")
+    logging.info(f"Installed on {results.count('installed')} host(s), {results.count('skipped')} already up to date, {failed} failed"
+                 + (f", {deferred} left alone because they stayed busy." if deferred else "."))
+    failed += deferred
+    return failed == 0
+
 # Basic installers
 def install_ansible(args):
     logging.info("How would you like to install Ansible?")
@@ -479,86 +1835,213 @@ def install_ansible(args):
 
 def install_pip3():
     logging.info("Installing pip3...")
-    try:
-        # TODO (bug): We should also support Red Hat based distros, this is too distro dependent. Ironically, Ansible would help us here but we don't have it yet.
-        subprocess.check_output(["sudo", "apt", "install", "python3-pip"])
+    # TODO (bug): We should also support Red Hat based distros, this is too distro dependent. Ironically, Ansible would help us here but we don't have it yet.
+    # We've already asked, and apt's own question would be hidden along with the rest of its output, so answer it with -y.
+    process = run_command(["sudo", "apt", "install", "-y", "python3-pip"], interactive=True)
+    forget_prerequisites()
+    if process.returncode == 0:
         logging.info("pip3 installed successfully!")
-    except subprocess.CalledProcessError:
+    else:
         logging.error("Unable to install pip3. Please try again, or ask us for help!")
+        log_process_failure(process)
         return_to_menu()
 
 
 def install_ansible_using_pip3():
     logging.info("Installing Ansible using pip3...")
-    try:
-        # Check if we are running as root, if not we need to use sudo
-        if os.geteuid() != 0:
-            subprocess.check_output(["sudo", "pip3", "install", "ansible-core"])
-        else:
-            subprocess.check_output(["pip3", "install", "ansible-core"])
+    # Check if we are running as root, if not we need to use sudo
+    if os.geteuid() != 0:
+        process = run_command(["sudo", "pip3", "install", "ansible-core"], interactive=True)
+    else:
+        process = run_command(["pip3", "install", "ansible-core"])
+    forget_prerequisites()
+    if process.returncode == 0:
         logging.info("Ansible installed successfully!")
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        logging.error("Unable to install Ansible using pip3. Please try again.")
-        return False
+    logging.error("Unable to install Ansible using pip3. Please try again.")
+    log_process_failure(process)
+    return False
 
 def install_ansible_using_package_manager():
     logging.info("Installing Ansible using your package manager...")
-    try:
-        # TODO (bug): We should also support Red Hat based distros, this is too distro dependent. Ironically, Ansible would help us here but we don't have it yet.
-        subprocess.check_output(["sudo", "apt", "install", "ansible"])
+    # TODO (bug): We should also support Red Hat based distros, this is too distro dependent. Ironically, Ansible would help us here but we don't have it yet.
+    process = run_command(["sudo", "apt", "install", "-y", "ansible"], interactive=True)
+    forget_prerequisites()
+    if process.returncode == 0:
         logging.info("Ansible installed successfully!")
         return True
-    except subprocess.CalledProcessError:
-        logging.error("Unable to install Ansible using your package manager. Please try again.")
-        return_to_menu()
-        return False
+    logging.error("Unable to install Ansible using your package manager. Please try again.")
+    log_process_failure(process)
+    return_to_menu()
+    return False
 
 # Install checkers and verifiers
+# The tools BacBoot might need, and the arguments that make each one print its version.
+PREREQUISITES = {
+    "ansible": ["--version"],
+    "ansible-playbook": ["--version"],
+    "ansible-galaxy": ["--version"],
+    "ansible-inventory": ["--version"],
+    "git": ["--version"],
+    "pip3": ["--version"],
+    "docker": ["--version"],
+    "ssh": ["-V"],
+    "bacalhau": ["version", "--client"],
+}
+# Where we found each tool, worked out once per run by searching PATH ourselves rather than starting "which",
+# and each tool's version, which we only ask for if someone wants it. Both are forgotten whenever we install or remove something.
+prerequisite_paths = None
+prerequisite_versions = {}
+
+def find_prerequisites():
+    global prerequisite_paths
+    if prerequisite_paths is None:
+        import shutil
+        prerequisite_paths = {tool: shutil.which(tool) for tool in PREREQUISITES}
+    return prerequisite_paths
+
+def has_prerequisite(*tools):
+    return all(find_prerequisites()[tool] for tool in tools)
+
+def forget_prerequisites():
+    # Call this after installing or removing anything, so the next check looks again.
+    global prerequisite_paths
+    prerequisite_paths = None
+    prerequisite_versions.clear()
+
+async def find_prerequisite_versions(tools):
+    # Ask each tool for its version, all at once.
+    import asyncio
+    async def version(tool):
+        result = await run_process([find_prerequisites()[tool]] + PREREQUISITES[tool], timeout=30)
+        # Some tools (like ssh) print their version to stderr, and most print more than we want.
+        lines = (result.stdout.strip() or result.stderr.strip()).splitlines()
+        prerequisite_versions[tool] = lines[0].strip() if result.returncode == 0 and lines else None
+    await asyncio.gather(*[version(tool) for tool in tools if tool not in prerequisite_versions])
+
+def check_prerequisites(args):
+    # --check-prereqs: print everything we know about the tools BacBoot uses as JSON, for scripts to act on.
+    import asyncio
+    paths = find_prerequisites()
+    asyncio.run(find_prerequisite_versions([tool for tool, path in paths.items() if path]))
+    report = {tool: {"installed": path is not None, "path": path, "version": prerequisite_versions.get(tool)} for tool, path in paths.items()}
+    print(json.dumps(report, indent=2))
+
 def check_if_ansible_installed(args):
     if not args.silent:
         print("Checking if Ansible is installed... ", end="")
         # Flush the screen buffer to ensure our message is displayed before the next one.
         sys.stdout.flush()
-    try:
-        subprocess.check_output(["which", "ansible-playbook"])
-        subprocess.check_output(["which", "ansible"])
+    if has_prerequisite("ansible-playbook", "ansible"):
         if not args.silent:
             logging.info("found Ansible.")
         return True
-    except subprocess.CalledProcessError:
-        if not args.silent:
-            logging.warning("Ansible is not installed.")
-        return False
+    if not args.silent:
+        logging.warning("Ansible is not installed.")
+    return False
 
 def check_if_docker_installed(args):
     logging.info("Checking if Docker is installed...")
-    try:
-        # TODO (bug): If you have Podman installed, this check will succeed and technically should NOT!
-        subprocess.check_output(["which", "docker"])
+    # TODO (bug): If you have Podman installed, this check will succeed and technically should NOT!
+    if has_prerequisite("docker"):
         logging.info("Docker is installed.")
         return True
-    except subprocess.CalledProcessError:
-        logging.warning("Docker is not installed.")
-        return False
+    logging.warning("Docker is not installed.")
+    return False
 
 
 def check_if_pip3_installed(args):
     logging.info("Checking if pip3 is installed...")
-    try:
-        subprocess.check_output(["which", "pip3"])
+    if has_prerequisite("pip3"):
         logging.info("pip3 is installed.")
         return True
-    except subprocess.CalledProcessError:
-        logging.warning("pip3 is not installed.")
-        return False
+    logging.warning("pip3 is not installed.")
+    return False
 
 
 # Uninstallers
+# Everywhere a Bacalhau install (by any of our methods) keeps its data.
+BACALHAU_DATA_DIRS = ["/root/.bacalhau", "/home/*/.bacalhau", "/var/lib/bacalhau", "/etc/bacalhau"]
+
+def uninstall_script(args, local=False):
+    # One script that removes Bacalhau from a host and reports how much disk space that freed up.
+    # Ansible on this machine is left to uninstall_ansible, which knows how we installed it.
+    # Free space is measured before and after on each filesystem we might have touched (counting each filesystem once),
+    # so it includes things like Docker's image storage that don't show up as plain files.
+    binaries = " ".join(shlex.quote(path) for path in sorted({args.client_path, "/usr/local/bin/bacalhau", "/usr/bin/bacalhau"}))
+    script = [
+        "available() { df -Pk / /var /var/lib/docker /root /home 2>/dev/null | awk 'NR > 1 && !seen[$1]++ { total += $4 } END { print total + 0 }'; }",
+        "before=$(available)",
+        "if command -v systemctl >/dev/null 2>&1; then systemctl disable --now bacalhau >/dev/null 2>&1; rm -f /etc/systemd/system/bacalhau.service; systemctl daemon-reload >/dev/null 2>&1; fi",
+        "pkill -x bacalhau >/dev/null 2>&1",
+        "if command -v docker >/dev/null 2>&1; then docker rm -f bacalhau >/dev/null 2>&1; fi",
+        f"rm -f {binaries}",
+        "rm -rf " + " ".join(BACALHAU_DATA_DIRS),
+    ]
+    if args.remove_docker_images:
+        script.append(f"if command -v docker >/dev/null 2>&1; then docker images -q {BACALHAU_DOCKER_IMAGE} | sort -u | xargs -r docker rmi -f >/dev/null 2>&1; fi")
+    if args.remove_ansible and not local:
+        script.append("pip3 uninstall -y ansible-core >/dev/null 2>&1 || apt-get remove -y ansible >/dev/null 2>&1")
+    script += [
+        "sync",
+        "echo reclaimed=$(( ($(available) - before) * 1024 ))",
+        # Make sure we really got rid of what we removed. (A bacalhau somewhere else on the PATH isn't ours to remove.)
+        f"for path in {binaries} " + " ".join(BACALHAU_DATA_DIRS) + '; do if [ -e "$path" ]; then echo "$path is still there" >&2; exit 1; fi; done',
+    ]
+    return "; ".join(script)
+
+def format_bytes(count):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(count) < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
+
+async def uninstall_hosts(args, hosts):
+    # Remove Bacalhau from every host at once (up to --forks at a time), returning {host name: bytes reclaimed, or None if it failed}.
+    import asyncio
+    semaphore = asyncio.Semaphore(args.forks)
+    async def uninstall(host):
+        if is_local_host(host):
+            # Like everything else we do as root on this machine, let sudo ask for a password if it needs one.
+            argv = ["sh", "-c", uninstall_script(args, local=True)]
+            if os.geteuid() != 0:
+                argv.insert(0, "sudo")
+        else:
+            argv = remote_command(args, host, sudo_script(uninstall_script(args)))
+        async with semaphore:
+            result = await run_process(argv, capture=True, interactive=is_local_host(host))
+        reclaimed = next((int(line.split("=", 1)[1]) for line in result.stdout.splitlines() if line.startswith("reclaimed=")), None)
+        if result.returncode != 0:
+            logging.error(f"{host['name']}: we couldn't fully remove Bacalhau ❌")
+            log_process_failure(result, lines=5)
+            return host["name"], None
+        logging.info(f"{host['name']}: removed, {format_bytes(max(reclaimed or 0, 0))} reclaimed ✅")
+        return host["name"], reclaimed
+    return dict(await asyncio.gather(*[uninstall(host) for host in hosts]))
+
 def uninstall_bacalhau(args):
+    import asyncio
     logging.info("Let's uninstall Bacalhau. Whether you're done using it, or you just want to remove it, we can help you do that.")
     logging.info("We're happy you chose to try it out either way! 🤗")
-    logging.error("(UNIMPLEMENTED) Not actually uninstalling Bacalhau yet")
+    hosts = load_target_hosts(args)
+    extras = [name for name, flag in [("Bacalhau's Docker images", args.remove_docker_images), ("Ansible", args.remove_ansible)] if flag]
+    logging.info(f"We'll stop Bacalhau and remove it and its data{' (and ' + ' and '.join(extras) + ')' if extras else ''} from {len(hosts)} host(s): {', '.join(host['name'] for host in hosts)}")
+    if not args.unattended:
+        if input("Enter 'y' to go ahead, or anything else to keep everything as it is: ").strip().lower() != "y":
+            logging.info("Okay, we haven't removed anything.")
+            return False
+    unusable = set(prefetch_host_keys(args, hosts))
+    if unusable:
+        logging.warning(f"Skipping {len(unusable)} host(s) we couldn't connect to safely.")
+    results = asyncio.run(uninstall_hosts(args, [host for host in hosts if host["name"] not in unusable]))
+    forget_prerequisites()
+
+    removed = [name for name, reclaimed in results.items() if reclaimed is not None]
+    total = sum(max(reclaimed, 0) for reclaimed in results.values() if reclaimed is not None)
+    logging.info("")
+    logging.info(f"Removed Bacalhau from {len(removed)} of {len(hosts)} host(s), reclaiming {format_bytes(total)} in total.")
+    return len(removed) == len(hosts)
 
 def uninstall_ansible(args):
     logging.info("Uninstalling Ansible...")
@@ -567,6 +2050,11 @@ def uninstall_ansible(args):
     1) Installed Ansible using pip3
     2) Installed Ansible using my package manager
     """)
+    if args.unattended:
+        # Nobody to ask, so try pip3 first and fall back to the package manager.
+        if not uninstall_ansible_using_pip3():
+            uninstall_ansible_using_package_manager()
+        return
     choice = input("Enter your choice or enter 'q' to quit without making any further changes: ")
     if choice == "1":
         uninstall_ansible_using_pip3()
@@ -576,19 +2064,20 @@ def uninstall_ansible(args):
         logging.warning("Did not uninstall Ansible or make any changes as you chose to quit. We'll continue the uninstallation process though, unless you want to quit.")
         logging.warning("To abort now, just press CTRL-C.")
 
-def uninstall_ansible_using_pip3(args):
+def uninstall_ansible_using_pip3():
     logging.info("Uninstalling Ansible using pip3...")
-    try:
-        # Check if we are running as root, if not, we need to use sudo
-        if os.geteuid() != 0:
-            subprocess.check_output(["sudo", "pip3", "uninstall", "-y", "ansible-core"])
-        else:
-            subprocess.check_output(["pip3", "uninstall", "-y", "ansible-core"])
+    # Check if we are running as root, if not, we need to use sudo
+    if os.geteuid() != 0:
+        process = run_command(["sudo", "pip3", "uninstall", "-y", "ansible-core"], interactive=True)
+    else:
+        process = run_command(["pip3", "uninstall", "-y", "ansible-core"])
+    forget_prerequisites()
+    if process.returncode == 0:
         logging.info("Ansible uninstalled successfully!")
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        logging.error("Unable to uninstall Ansible using pip3. Sorry! Please try again.")
-        return False
+    logging.error("Unable to uninstall Ansible using pip3. Sorry! Please try again.")
+    log_process_failure(process)
+    return False
 
 def uninstall_ansible_using_package_manager():
     logging.info("Uninstalling Ansible using your package manager...")
@@ -598,17 +2087,12 @@ def uninstall_ansible_using_package_manager():
     # Uninstall Ansible, then check we succeeded in removing it.
     # Check if we are running as root, if not, we need to use sudo
     if os.geteuid() != 0:
-        process = subprocess.run(["sudo", "apt", "remove", "-y", "ansible"])
+        process = run_command(["sudo", "apt", "remove", "-y", "ansible"], interactive=True)
     else:
-        process = subprocess.run(["apt", "remove", "-y", "ansible"])
-    try:
-        # Check for the Ansible binary using "which", and return false if we still find it
-        subprocess.check_output(["which", "ansible"])
-        # If the subprocess returned true, then we still have Ansible installed, so we need to return false
-        is_ansible_installed = True
-    except subprocess.CalledProcessError:
-        # If the subprocess raised an exception, that means "which" did not find Ansible, so it's uninstalled
-        is_ansible_installed = False
+        process = run_command(["apt", "remove", "-y", "ansible"])
+    # Look for the Ansible binary again. If we still find it, Ansible is still installed.
+    forget_prerequisites()
+    is_ansible_installed = has_prerequisite("ansible")
 
     # Check if we succeeded in removing Ansible by examining the exit code and checking if Ansible is still installed
     if process.returncode == 0 and not is_ansible_installed:
@@ -616,6 +2100,7 @@ def uninstall_ansible_using_package_manager():
         return True
     else:
         logging.error("An error occurred during uninstallation. Ansible may still be installed.")
+        log_process_failure(process)
         return False
 
 
@@ -631,17 +2116,12 @@ def uninstall_pip3():
     # Uninstall pip3, then check we succeeded in removing it.
     # Check if we are running as root, if not, we need to use sudo
     if os.geteuid() != 0:
-        process = subprocess.run(["sudo", "apt", "remove", "-y", "python3-pip"])
+        process = run_command(["sudo", "apt", "remove", "-y", "python3-pip"], interactive=True)
     else:
-        process = subprocess.run(["apt", "remove", "-y", "python3-pip"])
-    try:
-        # Check for the pip3 binary using "which", and return false if we still find it
-        subprocess.check_output(["which", "pip3"])
-        # If the subprocess returned true, then we still have pip3 installed, so we need to return false
-        is_pip3_installed = True
-    except subprocess.CalledProcessError:
-        # If the subprocess raised an exception, that means "which" did not find pip3, so it's uninstalled
-        is_pip3_installed = False
+        process = run_command(["apt", "remove", "-y", "python3-pip"])
+    # Look for the pip3 binary again. If we still find it, pip3 is still installed.
+    forget_prerequisites()
+    is_pip3_installed = has_prerequisite("pip3")
     
     # Check if we succeeded in removing pip3 by examining the exit code and checking if pip3 is still installed
     if process.returncode == 0 and not is_pip3_installed:
@@ -649,10 +2129,11 @@ def uninstall_pip3():
         return True
     else:
         logging.error("An error occurred during uninstallation. pip3 may still be installed.")
+        log_process_failure(process)
         return False
 
 # Experimental cloud features! HERE BE DRAGONS.
-def deploy_to_cloud():
+def deploy_to_cloud(args):
     # "ruh roh"
     logging.warning("Oh god, we warned you. Really, you want to try this?")
     logging.warning("Well, okay... if you're sure...")
@@ -667,122 +2148,491 @@ def deploy_to_cloud():
     logging.info("Actually, since we're in a hurry, and I'm being so obliging...")
     logging.info("you don't get a choice. DigitalOcean it is!")
     # We're just playing a bit here. DigitalOcean is the only provider we've implemented support for yet.
-    deploy_to_digitalocean()
+    return deploy_to_digitalocean(args)
+
+DIGITALOCEAN_API = "https://api.digitalocean.com/v2"
+# The most droplets DigitalOcean will create in a single request.
+DIGITALOCEAN_BATCH_SIZE = 10
+
+def cloud_api_request(args, token, method, path, body=None):
+    # Make one request to the provider's API (or --cloud-api-url), returning the decoded JSON response.
+    # Errors (including HTTP errors) are raised as OSError.
+    import urllib.request
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(args.cloud_api_url.rstrip("/") + path, data=data, method=method,
+                                     headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read() or b"{}")
+
+def digitalocean_ssh_key(args, token, public_key):
+    # Find our SSH key in the DigitalOcean account, adding it if it isn't there yet. Returns its ID.
+    for key in cloud_api_request(args, token, "GET", "/account/keys?per_page=200").get("ssh_keys", []):
+        if key["public_key"].split()[:2] == public_key.split()[:2]:
+            return key["id"]
+    return cloud_api_request(args, token, "POST", "/account/keys", {"name": "bacboot", "public_key": public_key})["ssh_key"]["id"]
+
+def repin_host_keys(lines):
+    # Pin the host keys of a machine we've just created, replacing anything we had pinned for its address before.
+    # Cloud providers recycle addresses, and a brand new machine is the one time a new key is exactly what we expect.
+    key_host = lines[0].split()[0]
+    kept = []
+    if os.path.exists(BACBOOT_KNOWN_HOSTS):
+        with open(BACBOOT_KNOWN_HOSTS, "r") as f:
+            kept = [line for line in f if line.split()[:1] != [key_host]]
+    os.makedirs(os.path.dirname(BACBOOT_KNOWN_HOSTS), mode=0o700, exist_ok=True)
+    with open(BACBOOT_KNOWN_HOSTS, "w") as f:
+        f.writelines(kept + [line + "\n" for line in lines])
+
+async def deploy_cloud_machines(args, token, regions, count, size, image, ssh_key_id):
+    # Provision every region at once, and configure each machine as soon as it answers over SSH,
+    # rather than waiting for the whole fleet to come up first. At most --forks machines are configured at once.
+    # Returns one result per machine.
+    import asyncio
+    start = time.monotonic()
+    semaphore = asyncio.Semaphore(args.forks)
+    # Install the playbook's requirements while the machines are being created, since that takes a while anyway.
+    requirements = asyncio.create_task(run_process(["ansible-galaxy", "install", "-r", os.path.join(BACBOOT_PLAYBOOK_DIR, "requirements.yml")]))
+
+    async def deploy_machine(droplet, region):
+        result = {"name": droplet["name"], "region": region, "address": None, "ready": None, "configured": None, "status": "failed"}
+        deadline = time.monotonic() + args.cloud_timeout
+        # Wait for the droplet to finish booting and get a public address.
+        while not result["address"]:
+            if time.monotonic() > deadline:
+                logging.error(f"{droplet['name']} didn't come up within {args.cloud_timeout:g} seconds.")
+                return result
+            await asyncio.sleep(args.cloud_poll_interval)
+            try:
+                droplet = (await asyncio.to_thread(cloud_api_request, args, token, "GET", f"/droplets/{droplet['id']}"))["droplet"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Couldn't check on {droplet['name']} ({e}), we'll try again.")
+                continue
+            if droplet.get("status") == "active":
+                result["address"] = next((network["ip_address"] for network in droplet.get("networks", {}).get("v4", []) if network.get("type") == "public"), None)
+        host = {"name": droplet["name"], "vars": {"ansible_host": result["address"], "ansible_user": "root"}}
+        # Then for SSH to answer, which also gets us the host keys to pin.
+        while True:
+            lines = (await scan_host_keys(args, [host]))[host["name"]]
+            if lines:
+                break
+            if time.monotonic() > deadline:
+                logging.error(f"{droplet['name']} ({result['address']}) never answered over SSH.")
+                return result
+            await asyncio.sleep(args.cloud_poll_interval)
+        repin_host_keys(lines)
+        result["ready"] = time.monotonic() - start
+        logging.info(f"{droplet['name']} ({result['address']}) is up after {format_duration(result['ready'])}. Configuring it...")
+        async with semaphore:
+            galaxy = await requirements
+            if galaxy.returncode != 0:
+                return result
+            process = await run_process(["ansible-playbook", "--become", "-i", result["address"] + ",", "-u", "root",
+                                         os.path.join(BACBOOT_PLAYBOOK_DIR, "bacalhau-node.yml"),
+                                         "--ssh-common-args", "-o " + shlex.quote(known_hosts_option())])
+        if process.returncode != 0:
+            logging.error(f"We couldn't configure {droplet['name']} ({result['address']}):")
+            log_process_failure(process)
+            return result
+        result["configured"] = time.monotonic() - start
+        result["status"] = "configured"
+        logging.info(f"{droplet['name']} is ready after {format_duration(result['configured'])}. ✅")
+        return result
+
+    async def deploy_region(region):
+        names = [f"bacalhau-{region}-{number}" for number in range(1, count + 1)]
+        droplets = []
+        for batch in range(0, count, DIGITALOCEAN_BATCH_SIZE):
+            try:
+                response = await asyncio.to_thread(cloud_api_request, args, token, "POST", "/droplets", {
+                    "names": names[batch:batch + DIGITALOCEAN_BATCH_SIZE], "region": region, "size": size, "image": image,
+                    "ssh_keys": [ssh_key_id], "tags": ["bacboot", "bacalhau"]})
+                droplets += response["droplets"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"We couldn't create machines in {region}: {e}")
+        logging.info(f"Creating {len(droplets)} machine(s) in {region}...")
+        failed = [{"name": name, "region": region, "address": None, "ready": None, "configured": None, "status": "failed"}
+                  for name in names[len(droplets):]]
+        return failed + list(await asyncio.gather(*[deploy_machine(droplet, region) for droplet in droplets]))
+
+    results = sum(await asyncio.gather(*[deploy_region(region) for region in regions]), [])
+    galaxy = await requirements
+    if galaxy.returncode != 0:
+        logging.error("We couldn't install the required Ansible roles and collections, so we couldn't configure any machines:")
+        log_process_failure(galaxy)
+    return results
+
+def deploy_to_digitalocean(args):
+    # Work out everything we need up front, from the command line where we can, so the deployment itself can run without stopping.
+    import asyncio
+    do_api_token = os.environ.get("DIGITALOCEAN_TOKEN", "")
+    if not do_api_token:
+        try:
+            with open(os.path.expanduser("~/.digitalocean_api_token"), "r") as f:
+                do_api_token = f.read().strip()
+        except FileNotFoundError:
+            pass
+    do_regions = [region.strip() for region in (args.cloud_region or "").split(",") if region.strip()]
+    do_number_of_machines = str(args.cloud_machines or "")
+    do_size = args.cloud_size
+    do_image = args.cloud_image
+    ssh_public_key = args.cloud_ssh_key
 
-def deploy_to_digitalocean():
-    ### DEBUG STUFF ###
-    # Fetch my API token from ~/.digitalocean_api_token
-    do_api_token = ""
-    try:
-        with open(os.path.expanduser("~/.digitalocean_api_token"), "r") as f:
-            do_api_token = f.read()
-    except FileNotFoundError:
-        logging.error("Unable to find your DigitalOcean API token. Please create a file called ~/.digitalocean_api_token and paste your API token into it.")
-        sys.exit(1)
-    do_region = "sgp1"
-    do_size = "s-2vcpu-4gb"
-    do_image = "ubuntu-22-04-x64"
-    ssh_public_key = ""
-    do_number_of_machines = ""
-    ### REMOVE LATER ###
+    if args.unattended:
+        if not do_api_token:
+            logging.error("Unable to find your DigitalOcean API token. Please set DIGITALOCEAN_TOKEN, or create a file called ~/.digitalocean_api_token and paste your API token into it.")
+            return False
+        if not do_regions:
+            logging.error("Please tell us which region(s) to deploy to with --cloud-region, for example --cloud-region sgp1,nyc3.")
+            return False
+        do_number_of_machines = do_number_of_machines or "1"
 
     logging.info("We'll need to gather some info before we get started.")
-    logging.info("First, we'll need your DigitalOcean API Personal Access Token.")
-    logging.info("You can find this by going to https://cloud.digitalocean.com/account/api/tokens")
-    logging.info("and clicking \"Generate New Token\". Give it a name, and make sure it has the \"Read\" and \"Write\" permissions.")
+    if not do_api_token:
+        logging.info("First, we'll need your DigitalOcean API Personal Access Token.")
+        logging.info("You can find this by going to https://cloud.digitalocean.com/account/api/tokens")
+        logging.info("and clicking \"Generate New Token\". Give it a name, and make sure it has the \"Read\" and \"Write\" permissions.")
     while (not do_api_token) or (do_api_token.strip() == ""):
-        do_api_token = input("Then, copy the token and paste it here, or press 'q' to abort: ")
+        do_api_token = input("Then, copy the token and paste it here, or press 'q' to abort: ").strip()
         if do_api_token.lower() == 'q':
             sys.exit(1)
-    logging.info("Next, we'll need to know what region you want to deploy to.")
-    logging.info("You can find a list of regions here: https://developers.digitalocean.com/documentation/v2/#list-all-regions")
-    logging.info("Just copy the slug for the region you want to deploy to.")
-    while (not do_region) or (do_region.strip() == ""):
-        do_region = input("Then, copy the slug and paste it here, or press 'q' to abort: ")
-        if do_region.lower() == 'q':
+    if not do_regions:
+        logging.info("Next, we'll need to know what region(s) you want to deploy to.")
+        logging.info("You can find a list of regions here: https://developers.digitalocean.com/documentation/v2/#list-all-regions")
+        logging.info("Just copy the slug for each region you want to deploy to, separated by commas.")
+    while not do_regions:
+        answer = input("Then, copy the slug(s) and paste them here, or press 'q' to abort: ")
+        if answer.lower() == 'q':
             sys.exit(1)
+        do_regions = [region.strip() for region in answer.split(",") if region.strip()]
     while (not do_number_of_machines) or (do_number_of_machines.strip() == ""):
-        do_number_of_machines = input("How many machines do you want to deploy? ")
+        do_number_of_machines = input("How many machines do you want to deploy in each region? ")
         if do_number_of_machines.lower() == 'q' or not do_number_of_machines.isdigit():
             print("Please enter a number... aborting.")
             sys.exit(1)
-    logging.info("Finally, we'll need to know what size droplet you want to deploy.")
-    logging.info("You can find a list of droplet sizes here: https://developers.digitalocean.com/documentation/v2/#list-all-sizes")
-    logging.info("Just copy the slug for the size you want to deploy.")
-    while (not do_api_token) or (do_api_token.strip() == ""):
-        do_size = input("Then, copy the slug and paste it here, or press 'q' to abort: ")
-        if do_size.lower() == 'q':
-            sys.exit(1)
-    logging.info("Pick an existing SSH public key to pre-deploy on the machines:")
-    # List .pub files found in ~/.ssh/ and ask the user to pick one
+    if not do_size:
+        do_size = "s-2vcpu-4gb"
+        if not args.unattended:
+            logging.info("Finally, we'll need to know what size droplet you want to deploy.")
+            logging.info("You can find a list of droplet sizes here: https://developers.digitalocean.com/documentation/v2/#list-all-sizes")
+            logging.info("Just copy the slug for the size you want to deploy.")
+            answer = input(f"Then, copy the slug and paste it here, press [ENTER] for {do_size}, or press 'q' to abort: ").strip()
+            if answer.lower() == 'q':
+                sys.exit(1)
+            do_size = answer or do_size
     # TODO (feat) (good-first-issue): We should probably support other SSH key locations, like /etc/ssh/ssh_host_rsa_key.pub
     # TODO (feat) (good-first-issue): Check that the key is actually a valid choice
-    while (ssh_public_key is not None and not ssh_public_key) or (ssh_public_key is not None and ssh_public_key.strip() == ""):
+    if not ssh_public_key:
         ssh_dir = os.path.expanduser("~/.ssh/")
-        ssh_public_keys = [os.path.join(ssh_dir, f) for f in os.listdir(ssh_dir) if f.endswith(".pub")]
-        for i, key_file in enumerate(ssh_public_keys, start=1):
-            logging.info(f"{i}) {key_file}")
-        ssh_key_choice = int(input("Then, enter the number of the key you want to use: "))
-        ssh_public_key = ssh_public_keys[ssh_key_choice - 1]
+        ssh_public_keys = sorted(os.path.join(ssh_dir, f) for f in os.listdir(ssh_dir) if f.endswith(".pub")) if os.path.isdir(ssh_dir) else []
+        if not ssh_public_keys:
+            logging.error("We couldn't find an SSH public key in ~/.ssh to put on the machines. Please create one (or use --cloud-ssh-key) and try again.")
+            return False
+        if args.unattended:
+            ssh_public_key = ssh_public_keys[0]
+        else:
+            logging.info("Pick an existing SSH public key to pre-deploy on the machines:")
+            for i, key_file in enumerate(ssh_public_keys, start=1):
+                logging.info(f"{i}) {key_file}")
+            ssh_key_choice = int(input("Then, enter the number of the key you want to use: "))
+            ssh_public_key = ssh_public_keys[ssh_key_choice - 1]
+    with open(os.path.expanduser(ssh_public_key), "r") as f:
+        public_key = f.read().strip()
+
+    # We configure the machines with the usual node playbook, so get it (and pin the version) before anything is created.
+    get_and_check_playbook(args)
+    set_version_override(args, resolve_bacalhau_version(args))
 
-    print("DEBUG " + ssh_public_key)
     logging.info("Okay, we're ready to deploy to DigitalOcean!")
     logging.error("But I'm still in a bad mood, so nope, we won't. Sorry!")
     logging.info("...I'm just kidding. Let's do it!")
-
-    run_ansible_playbook("cloud.yml", args, inventory="localhost", extraopts={
-        "do_api_token": do_api_token,
-        "do_region": do_region,
-        "do_size": do_size,
-        "do_image": do_image,
-        "do_number_of_machines": do_number_of_machines,
-        "ssh_public_key": ssh_public_key
-    })
+    logging.info(f"Creating {do_number_of_machines} {do_size} machine(s) in each of {', '.join(do_regions)}, using {ssh_public_key}.")
+    start = time.monotonic()
+    try:
+        ssh_key_id = digitalocean_ssh_key(args, do_api_token, public_key)
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"We couldn't add your SSH key to DigitalOcean: {e}")
+        return False
+    results = asyncio.run(deploy_cloud_machines(args, do_api_token, do_regions, int(do_number_of_machines), do_size, do_image, ssh_key_id))
+
+    # Keep an inventory of everything that came up, so you can watch, upgrade or uninstall it with --inventory later.
+    inventory_path = os.path.join(BACBOOT_CACHE_DIR, "cloud-inventory")
+    os.makedirs(BACBOOT_CACHE_DIR, exist_ok=True)
+    with open(inventory_path, "w") as f:
+        f.write("[bacalhau]\n")
+        for result in results:
+            if result["address"]:
+                f.write(f"{result['name']} ansible_host={result['address']} ansible_user=root\n")
+
+    configured = [result for result in results if result["status"] == "configured"]
+    logging.info("")
+    for result in results:
+        if result["status"] == "configured":
+            logging.info(f"✅ {result['name']} ({result['address']}): up after {format_duration(result['ready'])}, ready after {format_duration(result['configured'])}")
+        else:
+            logging.error(f"❌ {result['name']} ({result['address'] or 'no address'}): failed")
+    if configured:
+        logging.info(f"The slowest machine was ready after {format_duration(max(result['configured'] for result in configured))}.")
+    logging.info(f"Deployed {len(configured)} of {len(results)} machine(s) across {len(do_regions)} region(s) in {format_duration(time.monotonic() - start)}.")
+    logging.info(f"We saved an inventory of your new machines to {inventory_path}.")
+    return bool(results) and len(configured) == len(results)
+
+# Post-install tasks
+async def pull_images(args, hosts, images):
+    # Pull every image on every host, keeping at most --forks pulls running at once.
+    import asyncio
+    semaphore = asyncio.Semaphore(args.forks)
+    # Go image by image across the hosts, so a concurrency limit spreads the load instead of piling onto one host.
+    jobs = [(host, image) for image in images for host in hosts]
+    progress = {"done": 0}
+    async def pull(host, image):
+        async with semaphore:
+            result = await run_process(remote_command(args, host, f"docker pull -q {shlex.quote(image)}"))
+            progress["done"] += 1
+            status = f"[{progress['done']}/{len(jobs)}] {host['name']}: {image}"
+            if result.returncode == 0:
+                logging.info(f"{status} pulled in {result.duration:.1f}s ✅")
+            else:
+                logging.error(f"{status} failed ❌ {result.stderr.strip()}")
+            return result.returncode == 0
+    return await asyncio.gather(*[pull(host, image) for host, image in jobs])
+
+def prewarm_images(args):
+    # Pull the images jobs are likely to use ahead of time, so the first job on a new node doesn't have to wait for them.
+    import asyncio
+    images = [image.strip() for image in args.prewarm_images.split(",") if image.strip()]
+    hosts = load_target_hosts(args, groups=["bacalhau_node"])
+    unusable_hosts = prefetch_host_keys(args, hosts)
+    hosts = [host for host in hosts if host["name"] not in unusable_hosts]
+    logging.info(f"Pre-warming {len(images)} image(s) on {len(hosts)} host(s)...")
+    results = asyncio.run(pull_images(args, hosts, images)) + [False] * len(unusable_hosts) * len(images)
+    if all(results):
+        logging.info("All images are ready to go! 🔥")
+        return True
+    logging.warning(f"{results.count(False)} of {len(results)} image pulls failed. Jobs using those images will pull them when they first run.")
+    return False
 
 # Installation and functionality verification functions
 def verify_client():
     # Run a Bacalhau job and get the results
     logging.info("Verifying that Bacalhau client is installed and working correctly...")
-    try:
-        # Run the command "bacalhau docker run ubuntu echo Hello World"
-        command = ["bacalhau", "docker", "run", "ubuntu", "echo", "Hello World"]
-        result = subprocess.run(command, capture_output=True, text=True)
-        output_lines = result.stdout.split("\n")
-
-        relevant_lines = [line for line in output_lines if "...." in line and any(char in EMOJI_CHARS for char in line)]
-        if len(relevant_lines) == 0:
-            logging.error("Bacalhau client verification failed.")
-            choice = input("Would you like to know more about what went wrong? (print debug information) [y/n]: ")
-            if choice.lower() == "y":
-                logging.error(result.stderr)
-                logging.error(result.stdout)
-            return False
-        else:
-            for line in relevant_lines:
-                if "✅" not in line:
-                    logging.error("Bacalhau client verification failed.")
-                    choice = input("Would you like to know more about what went wrong? (print debug information) [y/n]: ")
-                    if choice.lower() == "y":
-                        logging.error(result.stderr)
-                        logging.error(result.stdout)
-                    return False
-            return True
-    except subprocess.CalledProcessError as e:
+    # Run the command "bacalhau docker run ubuntu echo Hello World"
+    command = ["bacalhau", "docker", "run", "ubuntu", "echo", "Hello World"]
+    timeout = command_timeout(command)
+    result = run_command(command, timeout=timeout, capture=True)
+    if result.timed_out:
+        logging.error(f"Bacalhau client verification timed out after {timeout:g} seconds.")
+    output_lines = result.stdout.split("\n")
+
+    relevant_lines = [line for line in output_lines if "...." in line and any(is_emoji_char(char) for char in line)]
+    if len(relevant_lines) == 0 or any("✅" not in line for line in relevant_lines):
         logging.error("Bacalhau client verification failed.")
-        logging.error("Error code:", e.returncode)
+        if args.unattended:
+            # Nobody's there to ask, so show the end of what the client said.
+            log_process_failure(result)
+            return False
         choice = input("Would you like to know more about what went wrong? (print debug information) [y/n]: ")
         if choice.lower() == "y":
-            logging.error(e.stderr)
-            logging.error(e.stdout)
+            logging.error(result.stderr)
+            logging.error(result.stdout)
         return False
+    return True
+
+def verify_nodes(args):
+    # Check that every node in the inventory (or this machine) is reachable and running the Bacalhau agent,
+    # using the same probe as watch mode (including the test job, with --watch-job-probe).
+    import asyncio
+    hosts = load_target_hosts(args, groups=["bacalhau_node"])
+    unusable_hosts = prefetch_host_keys(args, hosts)
+    hosts = [host for host in hosts if host["name"] not in unusable_hosts]
+    logging.info(f"Verifying Bacalhau on {len(hosts)} node(s)...")
+    async def probe_all():
+        semaphore = asyncio.Semaphore(args.forks)
+        return await asyncio.gather(*[probe_node(args, host, semaphore) for host in hosts])
+    healthy = 0
+    for host, result in zip(hosts, asyncio.run(probe_all())):
+        if result["up"] and result["job_success"] != 0:
+            healthy += 1
+            logging.info(f"{host['name']}: running {result['version'] or 'an unknown version'} ✅")
+        elif result["up"]:
+            logging.error(f"{host['name']}: the test job failed ❌")
+        elif result["reachable"]:
+            logging.error(f"{host['name']}: the Bacalhau agent isn't running ❌")
+        else:
+            logging.error(f"{host['name']}: couldn't connect ❌")
+    return healthy == len(hosts) and not unusable_hosts
 
 def verify_bacalhau_installation(args):
     # Noop
     logging.error("DEBUG: Not actually verifying yet.")
 
+# Continuous health watching
+# One round trip per host per probe: is the agent running, and what version is installed?
+WATCH_PROBE_SCRIPT = (
+    "if pgrep -x bacalhau >/dev/null 2>&1 || systemctl is-active --quiet bacalhau 2>/dev/null; then echo up=1; else echo up=0; fi; "
+    "echo version=$(bacalhau version 2>/dev/null | grep -o 'v[0-9][0-9.]*[^ ]*' | head -n 1)"
+)
+WATCH_JOB_PROBE_SCRIPT = "bacalhau docker run ubuntu echo bacboot-probe"
+
+async def probe_node(args, host, semaphore):
+    # Probe a single host, returning a dictionary of everything we learned about it.
+    result = {"reachable": 0, "up": 0, "version": "", "job_success": None, "duration": 0.0, "timestamp": 0.0}
+    async with semaphore:
+        start = time.monotonic()
+        probe = await run_process(remote_command(args, host, WATCH_PROBE_SCRIPT), timeout=args.watch_timeout, capture=True)
+        if probe.returncode == 0:
+            result["reachable"] = 1
+            for line in probe.stdout.splitlines():
+                key, _, value = line.partition("=")
+                if key == "up":
+                    result["up"] = int(value == "1")
+                elif key == "version":
+                    result["version"] = value.strip()
+            if args.watch_job_probe and result["up"]:
+                job = await run_process(remote_command(args, host, WATCH_JOB_PROBE_SCRIPT), timeout=args.watch_timeout)
+                result["job_success"] = int(job.returncode == 0)
+        else:
+            logging.warning(f"Couldn't probe {host['name']}: {probe.stderr.strip() or 'exit code ' + str(probe.returncode)}")
+        result["duration"] = time.monotonic() - start
+        result["timestamp"] = time.time()
+    return result
+
+def render_metrics(results):
+    # Render the latest probe results in the Prometheus text exposition format.
+    def label(value):
+        return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    metrics = [
+        ("bacboot_node_reachable", "Whether BacBoot could reach the host during the last probe.", "reachable"),
+        ("bacboot_node_up", "Whether the Bacalhau agent is running on the host.", "up"),
+        ("bacboot_node_job_probe_success", "Whether the last test job submitted from the host succeeded.", "job_success"),
+        ("bacboot_node_probe_duration_seconds", "How long the last probe of the host took.", "duration"),
+        ("bacboot_node_last_probe_timestamp_seconds", "When the host was last probed, as a Unix timestamp.", "timestamp"),
+    ]
+    lines = []
+    for name, description, key in metrics:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} gauge")
+        for host, result in sorted(results.items()):
+            if result[key] is not None:
+                lines.append(f"{name}{{host=\"{label(host)}\"}} {result[key]}")
+    lines.append("# HELP bacboot_node_info The Bacalhau version installed on the host.")
+    lines.append("# TYPE bacboot_node_info gauge")
+    for host, result in sorted(results.items()):
+        if result["version"]:
+            lines.append(f"bacboot_node_info{{host=\"{label(host)}\",version=\"{label(result['version'])}\"}} 1")
+    return "\n".join(lines) + "\n"
+
+def write_metrics_file(path, text):
+    # Write to a temporary file and rename it over the old one, so the node exporter never reads half a file.
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as f:
+        f.write(text)
+    os.replace(temporary_path, path)
+
+def serve_metrics(listen, state):
+    # Serve the latest metrics on /metrics from a background thread.
+    import threading
+    import http.server, socket
+    # The port is whatever comes after the last colon, so IPv6 addresses like [::]:9100 work too.
+    address, _, port = listen.rpartition(":")
+    address = address.strip("[]")
+    class MetricsServer(http.server.ThreadingHTTPServer):
+        address_family = socket.AF_INET6 if ":" in address else socket.AF_INET
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = state["text"].encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, format, *args):
+            # Scrapes are frequent, so keep them out of the log.
+            pass
+    # A bad address or a port that's taken raises ValueError or OSError, for the caller to report.
+    server = MetricsServer((address or "127.0.0.1", int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def watch_host(args, host, semaphore, results, publish):
+    # Probe a host forever. Each host starts at a random point in the interval and every wait is jittered,
+    # so a large fleet doesn't get probed (and doesn't probe the network) all at the same moment.
+    import asyncio, random
+    await asyncio.sleep(random.uniform(0, args.watch_interval))
+    while True:
+        results[host["name"]] = await probe_node(args, host, semaphore)
+        publish()
+        await asyncio.sleep(args.watch_interval * random.uniform(1 - args.watch_jitter, 1 + args.watch_jitter))
+
+async def watch_nodes_async(args, hosts, state):
+    import asyncio
+    semaphore = asyncio.Semaphore(args.forks)
+    results = {}
+    def publish():
+        state["text"] = render_metrics(results)
+        if args.metrics_file:
+            # A full disk or a directory that went away shouldn't stop the watch. Say so once, and again when it's fixed.
+            try:
+                write_metrics_file(args.metrics_file, state["text"])
+            except OSError as e:
+                if not state["write_failed"]:
+                    logging.error(f"We couldn't write the metrics to {args.metrics_file}, but we'll keep trying: {e}")
+                state["write_failed"] = True
+            else:
+                if state["write_failed"]:
+                    logging.info(f"Writing the metrics to {args.metrics_file} again.")
+                state["write_failed"] = False
+    await asyncio.gather(*[watch_host(args, host, semaphore, results, publish) for host in hosts])
+
+def watch_nodes(args):
+    # Keep an eye on every host in the inventory and export what we see for Prometheus to scrape.
+    import asyncio
+    if not args.metrics_file and not args.metrics_listen:
+        logging.error("Watch mode needs somewhere to put its results. Please set --metrics-file and/or --metrics-listen.")
+        sys.exit(1)
+    if not 0 <= args.watch_jitter < 1:
+        logging.error("--watch-jitter must be at least 0 and less than 1.")
+        sys.exit(1)
+    # Find out about a metrics file we can't write or an address we can't listen on now, rather than once we're watching.
+    state = {"text": render_metrics({}), "write_failed": False}
+    if args.metrics_file:
+        try:
+            write_metrics_file(args.metrics_file, state["text"])
+        except OSError as e:
+            logging.error(f"We can't write the metrics to {args.metrics_file}: {e}")
+            sys.exit(1)
+    if args.metrics_listen:
+        try:
+            serve_metrics(args.metrics_listen, state)
+        except (ValueError, OverflowError, OSError) as e:
+            logging.error(f"We can't serve metrics on {args.metrics_listen}: {str(e).rstrip('.')}. Please give --metrics-listen as [ADDRESS:]PORT, like 9101 or 0.0.0.0:9101.")
+            sys.exit(1)
+        logging.info(f"Serving metrics on http://{args.metrics_listen}/metrics")
+    hosts = load_target_hosts(args, groups=["bacalhau_node", "bacalhau_client"])
+    # Hosts we can't reach yet stay on the list. They'll simply show up as unreachable until they come back.
+    prefetch_host_keys(args, hosts)
+    logging.info(f"Watching {len(hosts)} host(s) every {args.watch_interval} seconds. Press CTRL-C to stop.")
+    try:
+        asyncio.run(watch_nodes_async(args, hosts, state))
+    except KeyboardInterrupt:
+        logging.info("")
+        logging.info("Stopped watching. See you next time! 👋")
+
 # Main program loop itself
+def positive_int(value):
+    # argparse type for counts that have to be at least one, like --forks. Zero would leave us waiting forever.
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} needs to be a whole number of at least 1")
+    return number
+
 def main():
-    global args
+    global args, command_timeout_override
     # Load in arguments passed on the command line.
     parser = argparse.ArgumentParser(description="""\
 Bacalhau Bootstrapper
@@ -799,22 +2649,57 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
     "-c", "--verify", nargs="?", const="client",
     help="Verify Bacalhau components and then exit. If no argument is passed, the client will be checked by default."
     )
+    parser.add_argument("--watch", help="Keep checking the health of every host in the inventory and export the results as Prometheus metrics. Runs until interrupted.", action="store_true")
     parser.add_argument("--cloud", help="Specify a cloud to deploy to or manage. If you don't specify a cloud, will use DigitalOcean.", default="do")
-    parser.add_argument("--cloud-region", help="Specify a region to deploy to or manage. Mandatory if --cloud is set.")
+    parser.add_argument("--cloud-region", help="Specify a region, or a comma-separated list of regions, to deploy to or manage. Mandatory if --cloud is set. Example: sgp1,nyc3,fra1")
+    parser.add_argument("--cloud-machines", help="How many machines to deploy in each cloud region. Default: 1 in unattended mode, otherwise we'll ask.", type=positive_int)
+    parser.add_argument("--cloud-size", help="Size of the cloud machines to deploy. Default: s-2vcpu-4gb.")
+    parser.add_argument("--cloud-image", help="Operating system image for the cloud machines. Default: ubuntu-22-04-x64.", default="ubuntu-22-04-x64")
+    parser.add_argument("--cloud-ssh-key", help="SSH public key to put on the cloud machines. Default: the first one in ~/.ssh in unattended mode, otherwise we'll ask.")
+    parser.add_argument("--cloud-api-url", help="Base URL of the cloud provider's API, for example a local mock for testing. Default: the DigitalOcean API.", default=DIGITALOCEAN_API)
+    parser.add_argument("--cloud-poll-interval", help="Seconds between checks on machines that are still starting up. Default: 5.", type=float, default=5)
+    parser.add_argument("--cloud-timeout", help="Seconds to wait for each cloud machine to start and answer over SSH. Default: 600.", type=float, default=600)
     parser.add_argument("--inventory", help="Specify the inventory file to use. If unspecified, will simply default to localhost. Mandatory for remote deployments.")
     parser.add_argument("--user", help="[UNDER CONSTRUCTION] Specify the user to use for remote deployments. If unspecified, will default to the current user.")
     parser.add_argument("-a", "--unattended", help="Run in unattended mode, and make reasonable decisions withfout user input", action="store_true")
     parser.add_argument("-s", "--silent", help="Run in silent mode, suppressing all output except warnings, errors, and a report at the end. Implies --unattended.", action="store_true")
     parser.add_argument("--truly-silent", help="Run in truly silent mode, only outputting errors or prompts needed for authentication such as sudo. Implies --silent.", action="store_true")
-    parser.add_argument("--dry-run", help="[UNIMPLEMENTED] Dry-run mode. Note that this WILL install Ansible on the machine running BacBoot. Can be combined with --remove-ansible.")
+    parser.add_argument("--dry-run", help="Dry-run mode. Shows what the playbook (or --method direct) would change on each host and estimates how long the real run will take, without changing any host or the playbook. Note that this WILL install Ansible on the machine running BacBoot. Can be combined with --remove-ansible.", action="store_true")
     parser.add_argument("-m", "--method", help="Specify the installation method to use. Default: Ansible.", choices=["ansible", "cloud", "docker", "direct"])
     parser.add_argument("--skip-verification", help="Always skip verification of the installed or upgraded components.", action="store_true")
     parser.add_argument("--ask-become-pass", help="Automatically ask for the sudo password when running Ansible.", action="store_true")
     parser.add_argument("--version", help="Specify a version of Bacalhau to install. Default: latest.", default="latest")
+    parser.add_argument("--release-api", help="Where to find out which Bacalhau release is the latest. Default: the GitHub releases API.", default=BACALHAU_RELEASE_API)
+    parser.add_argument("--release-cache-ttl", help="Seconds to remember which release is the latest between runs. Set to 0 to always check. Default: 3600.", type=float, default=3600)
     parser.add_argument("--remove-pip3", help="Remove pip3 from the system", action="store_true")
     parser.add_argument("--remove-docker", help="Remove Docker from the system", action="store_true")
-    parser.add_argument("--remove-ansible", help="Remove Ansible from the system, after doing any actions that require Ansible.", action="store_true")
+    parser.add_argument("--remove-ansible", help="Remove Ansible from the system, after doing any actions that require Ansible. When uninstalling, also removes it from every host in the inventory.", action="store_true")
+    parser.add_argument("--remove-docker-images", help="When uninstalling, also remove Bacalhau's Docker images from every host.", action="store_true")
     parser.add_argument("--experimental", help="Void the warranty and use experimental features. DO NOT USE THIS unless you know what you are doing!", action="store_true")
+    parser.add_argument("--docker-mirror", help="How to share the Bacalhau image with your hosts when installing using Docker. Default: registry.", choices=["registry", "tarball"], default="registry")
+    parser.add_argument("--docker-mirror-port", help="Port used for the temporary registry when installing using Docker. Default: 5000.", type=int, default=5000)
+    parser.add_argument("--prewarm-images", metavar="IMAGE[,IMAGE...]", help="After installing, pull these Docker images on every node so the first jobs using them start quickly. Example: ubuntu,python:3.11")
+    parser.add_argument("--skip-host-key-prefetch", help="Don't scan and pin SSH host keys of remote hosts before connecting to them.", action="store_true")
+    parser.add_argument("--ssh-timeout", help="Seconds to wait for a remote host to answer when fetching its SSH host keys. Default: 10.", type=int, default=10)
+    parser.add_argument("--client-path", help="Where to install the Bacalhau client on remote machines. Default: /usr/local/bin/bacalhau.", default="/usr/local/bin/bacalhau")
+    parser.add_argument("--delta", help="When upgrading the client with --method direct, only send the parts of the binary that changed.", action="store_true")
+    parser.add_argument("--batch-size", help="Run Ansible playbooks against this many hosts at a time, finishing each batch before starting the next. Default: all hosts at once.", type=positive_int)
+    parser.add_argument("--check-prereqs", help="Print which of the tools BacBoot uses are installed, where, and their versions as JSON, then exit.", action="store_true")
+    parser.add_argument("--command-report", metavar="FILE", help="When BacBoot finishes, write every command it ran (with its exit status and how long it took) and a count of each kind of command to FILE as JSON.")
+    parser.add_argument("--command-timeout", help="Give up on any single command BacBoot runs after this many seconds. Default: a limit that suits each command, from 5 minutes up to 4 hours for Ansible playbooks.", type=float)
+    parser.add_argument("--max-hosts-per-group", help="Work on at most this many hosts in each inventory group at once. Groups can set their own with bacboot_max_hosts. Default: no limit beyond --forks.", type=positive_int)
+    parser.add_argument("--bandwidth-limit", metavar="RATE", help="Send each inventory group at most this many bytes per second when pushing the client or Docker image tarballs, like 500K or 10M. Groups can set their own with bacboot_bandwidth_limit. Default: no limit.", type=rate_argument)
+    parser.add_argument("--max-load", help="Put off hosts whose 1 minute load average per CPU is above this, like 0.8. Groups can set their own with bacboot_max_load. Default: don't check.", type=float)
+    parser.add_argument("--max-running-jobs", help="Put off hosts running more than this many Bacalhau jobs. Groups can set their own with bacboot_max_jobs. Default: don't check.", type=int)
+    parser.add_argument("--defer-interval", help="Seconds before trying a host we put off again. Default: 60.", type=float, default=60)
+    parser.add_argument("--defer-timeout", help="Give up on a host that's still busy after this many seconds. Default: 3600.", type=float, default=3600)
+    parser.add_argument("--forks", help="Maximum number of hosts BacBoot talks to at once. Default: 10.", type=positive_int, default=10)
+    parser.add_argument("--watch-interval", help="Seconds between health checks of each host in watch mode. Default: 60.", type=float, default=60)
+    parser.add_argument("--watch-jitter", help="Randomly spread each watch interval by up to this fraction, so hosts aren't all probed at once. Default: 0.1.", type=float, default=0.1)
+    parser.add_argument("--watch-timeout", help="Seconds to wait for a single host to answer a health check. Default: 30.", type=float, default=30)
+    parser.add_argument("--watch-job-probe", help="In watch mode, also run a small test job on each healthy host.", action="store_true")
+    parser.add_argument("--metrics-file", help="In watch mode, write metrics to this file (for the Prometheus node exporter's textfile collector).")
+    parser.add_argument("--metrics-listen", metavar="[ADDRESS:]PORT", help="In watch mode, serve metrics on http://ADDRESS:PORT/metrics. ADDRESS defaults to 127.0.0.1. Put IPv6 addresses in brackets, like [::]:9101.")
 
     args = parser.parse_args()
 
@@ -833,6 +2718,21 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
         # By default, show all INFO and above messages
         logging.basicConfig(level=logging.INFO, format='%(message)s')
 
+    if args.command_timeout:
+        command_timeout_override = args.command_timeout
+    if args.command_report:
+        import atexit
+        atexit.register(write_command_report, args.command_report)
+
+    if args.check_prereqs:
+        check_prerequisites(args)
+        sys.exit(0)
+
+    # Watch mode runs until it's interrupted, so there's no menu to come back to.
+    if args.watch:
+        watch_nodes(args)
+        sys.exit(0)
+
     while True:
         # Unconditionally define choice, as NoneType by default.
         choice = None
@@ -871,13 +2771,34 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
                 logging.error("Quitting...")
                 sys.exit(1)
 
+            if args.dry_run and install_choice not in ['1', "ansible", "direct"]:
+                logging.error("Dry runs are only available when installing using Ansible or --method direct (for now!). Nothing has been changed.")
+                sys.exit(1)
+
             if install_choice == '1' or install_choice == "ansible":
                 # Call the function to install Bacalhau using Ansible here
                 install_using_ansible(args)
+                if args.dry_run:
+                    # Nothing was actually installed, so there's nothing to verify or clean up after.
+                    if not args.truly_silent:
+                        print("Dry run complete. Nothing has been changed.")
+                    break
                 if not args.truly_silent:
                     print("Successfully installed Bacalhau using Ansible.")
             elif install_choice == '2' or install_choice == "docker":
-                logging.error("Docker installation is not yet implemented.")
+                if install_using_docker(args) and not args.truly_silent:
+                    print("Successfully installed Bacalhau using Docker.")
+            elif install_choice == "direct":
+                # Just copy the client binary over SSH (or locally), no Ansible required.
+                logging.info("Installing the Bacalhau client with the direct installer, over SSH and without Ansible.")
+                if not push_clients(args):
+                    return_to_menu()
+                if args.dry_run:
+                    if not args.truly_silent:
+                        print("Dry run complete. Nothing has been changed.")
+                    break
+                if not args.truly_silent:
+                    print("Successfully installed the Bacalhau client.")
             elif install_choice == '3' or install_choice == "cloud":
                 logging.error("Cloud installation using Ansible and Terraform is not yet implemented.")
                 if not args.experimental:
@@ -888,13 +2809,15 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
                     logging.warning("This is under construction 🚧")
                     logging.warning("Mind the dust, it's pretty experimental.")
                     logging.warning("You have been warned!")
-                    deploy_to_cloud()
+                    deployed = deploy_to_cloud(args)
                     logging.warning("We had joy, we had fun, etc. Thanks for playing, goodnight!")
-                    sys.exit(1)
+                    sys.exit(0 if deployed else 1)
 
             else:
                 logging.error("Invalid choice of install method. Please try again.")
             # If we made it this far, we should have a working installation of Bacalhau.
+            if args.prewarm_images:
+                prewarm_images(args)
             if args.unattended:
                 should_verify = not args.skip_verification
             else:
@@ -914,7 +2837,7 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
                 uninstall_ansible(args)
             if args.remove_pip3:
                 logging.info("Removing pip3 as requested after successful actions.")
-                uninstall_pip3(args)
+                uninstall_pip3()
             # Exit the loop.
             break
 
@@ -928,7 +2851,11 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
     1) Bacalhau client
     2) Bacalhau node/cluster (also tests client)
     """)
-            verify_choice = input("Enter your choice or enter 'q' to quit without making any further changes (1-3, q): ").strip()
+            if args.verify and not relooping:
+                # Take the verify choice from the command line argument
+                verify_choice = "2" if args.verify in ["node", "nodes"] else "1"
+            else:
+                verify_choice = input("Enter your choice or enter 'q' to quit without making any further changes (1-3, q): ").strip()
             # Loop through the menu until the user selects a valid option.
             while verify_choice not in ['1', '2', '3', 'q']:
                 logging.error("Invalid choice of what to test. Please try again.")
@@ -942,35 +2869,50 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
                     break
                 else:
                     logging.error("Verification failed. 🎻😭 Bacalhau may be installed incorrectly. Please try again.")
-
-                logging.info("Looking good! You're all set. Enjoy! 🚀")
+                    if args.unattended:
+                        sys.exit(1)
                 break
             elif verify_choice == '2':
-                if verify_client() and verify_node():
+                client_verified = verify_client()
+                nodes_verified = verify_nodes(args)
+                if client_verified and nodes_verified:
                     logging.info("Looking good! You're all set. Enjoy! 🚀")
                     break
                 else:
-                    if not verify_client():
+                    if not client_verified:
                         logging.error("We failed to verify the Bacalhau client.")
-                    if not verify_node():
+                    if not nodes_verified:
                         logging.error("We failed to verify the Bacalhau node or cluster.")
                     logging.error("Verification failed. 🎻😭 Bacalhau may be installed incorrectly. Please try again.")
+                    if args.unattended:
+                        sys.exit(1)
 
-        elif choice == '5':
-            logging.error("Uninstalling Bacalhau is not yet fully implemented.")
-            uninstall_bacalhau()
-            is_ansible_installed = check_if_ansible_installed()
+        elif choice == '5' or (args.uninstall and not relooping):
+            if args.dry_run:
+                logging.error("Dry runs are only available for installs. Nothing has been changed.")
+                sys.exit(1)
+            if not uninstall_bacalhau(args) and args.unattended:
+                logging.error("We couldn't remove Bacalhau from every host, so we've left everything else as it is.")
+                sys.exit(1)
+            # In unattended mode, only remove the tools we were asked to with --remove-ansible, --remove-docker and --remove-pip3.
+            is_ansible_installed = check_if_ansible_installed(args)
             if is_ansible_installed:
                 logging.info("We detected an Ansible installation. Would you like to remove Ansible too?")
-                uninstall_ansible_choice = input("Enter 'y' to uninstall Ansible, or enter 'n' to keep it installed (y/n): ").strip()
+                if args.unattended:
+                    uninstall_ansible_choice = "y" if args.remove_ansible else "n"
+                else:
+                    uninstall_ansible_choice = input("Enter 'y' to uninstall Ansible, or enter 'n' to keep it installed (y/n): ").strip()
                 if uninstall_ansible_choice.lower() == 'y':
-                    uninstall_ansible()
+                    uninstall_ansible(args)
                 else:
                     logging.info("Leaving Ansible installed.")
-            is_docker_installed = check_if_docker_installed()
+            is_docker_installed = check_if_docker_installed(args)
             if is_docker_installed:
                 logging.info("We detected a Docker installation. Would you like to remove Docker too?")
-                uninstall_docker_choice = input("Enter 'y' to uninstall Docker, or enter 'n' to keep it installed (y/n): ").strip()
+                if args.unattended:
+                    uninstall_docker_choice = "y" if args.remove_docker else "n"
+                else:
+                    uninstall_docker_choice = input("Enter 'y' to uninstall Docker, or enter 'n' to keep it installed (y/n): ").strip()
                 if uninstall_docker_choice.lower() == 'y':
                     uninstall_docker()
                 else:
@@ -980,7 +2922,10 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
                 # We use warning instead of info here intentionally as this is a dangerous action for some users.
                 logging.warning("Finally, we noticed pip3 is installed. You probably DO want it, but if we installed it, we can remove it too.")
                 logging.warning("Would you like to remove it? Please be careful with your choice if this system ran or runs things other than bacalhau.")
-                uninstall_pip3_choice = input("Enter 'y' to uninstall pip3, or enter 'n' to keep it installed (y/n): ").strip()
+                if args.unattended:
+                    uninstall_pip3_choice = "y" if args.remove_pip3 else "n"
+                else:
+                    uninstall_pip3_choice = input("Enter 'y' to uninstall pip3, or enter 'n' to keep it installed (y/n): ").strip()
                 if uninstall_pip3_choice.lower() == 'y':
                     uninstall_pip3()
                 else:
@@ -992,6 +2937,9 @@ A tool for installing, managing and maintaining Bacalhau from the edge to the cl
             logging.info("and feel free to talk to us on #bacalhau on the Filecoin Slack!")
             logging.info("We would love to know what your experience was like, and we'd love to hear your feedback!")
             logging.info("Thanks, and have a great day! ⚡")
+            if args.uninstall:
+                # Exit the loop.
+                break
 
         elif choice in ['3', '4']:
             logging.error("This option is not yet implemented.")
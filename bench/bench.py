@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# Measure how much time BacBoot itself adds to each of its main flows, separate from the tools it drives.
+# Every external tool (git, ansible-playbook, apt, bacalhau...) is replaced with a stub that takes exactly as long
+# as we tell it to, and BacBoot is fed to python3 over stdin, just like "curl ... | python3 -".
+# The stubs log when they start and stop, so we know how much of each run was spent waiting on them,
+# and how many processes BacBoot started. Whatever time is left is ours.
+#
+# Usage: python3 bench/bench.py [--runs 10] [--latency SECONDS] [--tool-latency TOOL=SECONDS ...] [--max-overhead SECONDS]
+#                                [--baseline bench/baseline.json [--tolerance 0.25]] [--save-baseline FILE]
+import argparse
+import collections
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import mock_cloud
+
+BACBOOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py")
+
+# Timings are never exactly the same twice. Baselines compare each flow's fastest run, which a busy machine can't make
+# slower the way it can the median, and a flow is only slower than its baseline once it's slower by more than
+# --tolerance and by more than this many seconds.
+NOISE = 0.01
+
+# The stand-in tools. Each one is a small bash script (bash, so it can read the clock without starting another process).
+STUBS = {
+    # "Clone" an empty playbook, and report a clean, up-to-date repository for everything else.
+    "git": """
+if [ "$1" = "clone" ]; then
+    mkdir -p "$3/vars"
+    touch "$3/requirements.yml" "$3/requirements-cloud.yml" "$3/bacalhau-client.yml" "$3/bacalhau-node.yml" "$3/inventory"
+fi
+""",
+    "ansible": "",
+    "ansible-galaxy": "",
+    "ansible-playbook": """
+echo '{"plays": [], "stats": {"localhost": {"ok": 1, "changed": 1, "failures": 0, "unreachable": 0}}}'
+""",
+    "apt": "",
+    "pip3": """
+echo "pip 23.0 (python 3)"
+""",
+    "sudo": """
+"$@"
+""",
+    # Hand back a made-up host key for whichever host was asked about (always the last argument).
+    "ssh-keyscan": """
+echo "${@: -1} ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIBenchmarkBenchmarkBenchmarkBenchmarkBench"
+""",
+    # Pretend every remote command worked. The uninstall flow looks for how much space it freed up,
+    # and node verification for a running agent.
+    "ssh": """
+echo "reclaimed=1048576"
+echo "up=1"
+echo "version=v1.0.0"
+""",
+    # Look just like a successful "bacalhau docker run" to the client verification.
+    "bacalhau": """
+if [ "$1" = "docker" ]; then
+    echo "	Communicating with the network  ................  done ✅  0.1s"
+    echo "	   Creating job for submission  ................  done ✅  0.1s"
+    echo "	               Job in progress  ................  done ✅  0.1s"
+else
+    echo "Client Version: v1.0.0"
+fi
+""",
+}
+
+INVENTORY = """[bacalhau]
+node1 ansible_host=10.0.0.1
+node2 ansible_host=10.0.0.2
+node3 ansible_host=10.0.0.3
+"""
+
+# What we time. Each flow is a list of arguments to BacBoot, where {inventory} is a three-host inventory,
+# {cloud_api} is a mock cloud provider and {ssh_key} is an SSH public key.
+FLOWS = {
+    # Just starting up: reading the script, importing everything and parsing arguments.
+    "startup": ["--help"],
+    # The advertised one-liner, from a fresh machine with no playbook.
+    "install-client": ["--install", "client", "--unattended", "--silent", "--skip-verification"],
+    "install-node": ["--install", "node", "--unattended", "--silent", "--skip-verification"],
+    "remote-inventory": ["--install", "node", "--inventory", "{inventory}", "--unattended", "--silent", "--skip-verification"],
+    "verify": ["--verify", "client", "--unattended", "--silent"],
+    "verify-nodes": ["--verify", "node", "--inventory", "{inventory}", "--unattended", "--silent"],
+    # Against the inventory, so the benchmark never removes anything from the machine it's running on.
+    "uninstall": ["--uninstall", "--inventory", "{inventory}", "--unattended", "--silent", "--remove-pip3"],
+    # Two machines in each of three regions, each configured as soon as it's up.
+    "cloud": ["--install", "--method", "cloud", "--experimental", "--unattended", "--silent", "--cloud-api-url", "{cloud_api}",
+              "--cloud-region", "sgp1,nyc3,fra1", "--cloud-machines", "2", "--cloud-ssh-key", "{ssh_key}", "--cloud-poll-interval", "0.1"],
+}
+
+def write_stubs(directory, latencies):
+    os.makedirs(directory)
+    for name, body in STUBS.items():
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write("#!/usr/bin/env bash\n")
+            f.write("start=$EPOCHREALTIME\n")
+            if latencies.get(name):
+                f.write(f"sleep {latencies[name]}\n")
+            f.write(body.lstrip("\n"))
+            f.write("status=$?\n")
+            f.write(f'echo "{name} $start $EPOCHREALTIME" >> "$BACBOOT_BENCH_LOG"\n')
+            f.write("exit $status\n")
+        os.chmod(path, 0o755)
+
+def busy_time(intervals):
+    # How long at least one stub was running, counting overlapping stubs (like sudo and the command it runs) once.
+    busy, end = 0.0, None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            busy += stop - start
+            end = stop
+        elif stop > end:
+            busy += stop - end
+            end = stop
+    return busy
+
+def run_flow(workdir, stubs, cloud_api, arguments):
+    # Run BacBoot once in a fresh home and playbook directory.
+    # Returns how long it took, how much of that was spent in stubs, and how many times each stub was started.
+    run_dir = tempfile.mkdtemp(dir=workdir)
+    release_file = os.path.join(run_dir, "release.json")
+    with open(release_file, "w") as f:
+        json.dump({"tag_name": "v1.0.0"}, f)
+    inventory_file = os.path.join(run_dir, "inventory")
+    with open(inventory_file, "w") as f:
+        f.write(INVENTORY)
+    ssh_key_file = os.path.join(run_dir, "id_ed25519.pub")
+    with open(ssh_key_file, "w") as f:
+        f.write("ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIBenchmarkBenchmarkBenchmarkBenchmarkBench bench\n")
+    log_file = os.path.join(run_dir, "stubs.log")
+    open(log_file, "w").close()
+    env = dict(os.environ,
+               PATH=stubs + os.pathsep + os.environ["PATH"],
+               HOME=run_dir,
+               BACBOOT_PLAYBOOK_DIR=os.path.join(run_dir, "playbook"),
+               BACBOOT_CACHE_DIR=os.path.join(run_dir, "cache"),
+               BACBOOT_BENCH_LOG=log_file,
+               DIGITALOCEAN_TOKEN="bench")
+    with open(BACBOOT, "rb") as f:
+        script = f.read()
+    arguments = [argument.format(inventory=inventory_file, cloud_api=cloud_api, ssh_key=ssh_key_file) for argument in arguments]
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-", "--release-api", "file://" + release_file] + arguments,
+                             input=script, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env, cwd=run_dir)
+    elapsed = time.perf_counter() - start
+    spawns, intervals = collections.Counter(), []
+    with open(log_file, "r") as f:
+        for line in f:
+            name, started, stopped = line.split()
+            spawns[name] += 1
+            intervals.append((float(started), float(stopped)))
+    shutil.rmtree(run_dir)
+    if process.returncode != 0:
+        sys.exit(f"{' '.join(arguments)} failed with exit code {process.returncode}:\n{process.stderr.decode()}")
+    return elapsed, busy_time(intervals), spawns
+
+def run_baseline():
+    # How long python3 takes to start, read an empty script and exit.
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-"], input=b"", check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BacBoot's own overhead against stub tools.")
+    parser.add_argument("--runs", help="How many times to run each flow. Default: 10.", type=int, default=10)
+    parser.add_argument("--flow", help="Only run this flow. Can be given more than once. Default: all of them.", action="append", choices=list(FLOWS))
+    parser.add_argument("--latency", help="Seconds every stub tool takes to run. Default: 0.", type=float, default=0)
+    parser.add_argument("--tool-latency", metavar="TOOL=SECONDS", help="Seconds a particular stub tool takes to run, overriding --latency. Can be given more than once.", action="append", default=[])
+    parser.add_argument("--cloud-boot-time", help="Seconds the mock cloud takes to start each machine. This counts as overhead. Default: 0.", type=float, default=0)
+    parser.add_argument("--max-overhead", help="Exit with an error if any flow's median overhead is more than this many seconds.", type=float)
+    parser.add_argument("--baseline", help="Exit with an error if any flow's fastest run is more than --tolerance slower than the overhead recorded for it in this file (see --save-baseline).")
+    parser.add_argument("--tolerance", help="How much slower than the --baseline a flow may be, as a fraction. Default: 0.25.", type=float, default=0.25)
+    parser.add_argument("--save-baseline", metavar="FILE", help="Record the overhead of each flow's fastest run in FILE, for --baseline to compare later runs against.")
+    parser.add_argument("--json", help="Print the results as JSON instead of a table.", action="store_true")
+    args = parser.parse_args()
+
+    latencies = {name: args.latency for name in STUBS}
+    for setting in args.tool_latency:
+        name, _, seconds = setting.partition("=")
+        if name not in STUBS:
+            parser.error(f"there's no stub for {name}. Choose from: {', '.join(STUBS)}")
+        latencies[name] = float(seconds)
+    recorded = {}
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                recorded = json.load(f)["flows"]
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"couldn't read the baseline {args.baseline}: {e}")
+
+    workdir = tempfile.mkdtemp(prefix="bacboot-bench-")
+    results = {}
+    try:
+        stubs = os.path.join(workdir, "stubs")
+        write_stubs(stubs, latencies)
+        cloud = mock_cloud.MockCloud(boot_time=args.cloud_boot_time).serve()
+        cloud_api = f"http://127.0.0.1:{cloud.server_address[1]}/v2"
+        baseline = statistics.median([run_baseline() for _ in range(args.runs)])
+        if not args.json:
+            print(f"{'flow':<18} {'median':>8} {'tools':>8} {'overhead':>9}  spawns")
+            print(f"{'python3':<18} {baseline:>7.3f}s")
+        for name in args.flow or FLOWS:
+            runs = [run_flow(workdir, stubs, cloud_api, FLOWS[name]) for _ in range(args.runs)]
+            # Our overhead is whatever wasn't spent starting python3 or waiting on a tool.
+            overheads = [elapsed - tools - baseline for elapsed, tools, _ in runs]
+            spawns = runs[-1][2]
+            results[name] = {
+                "median": statistics.median([elapsed for elapsed, _, _ in runs]),
+                "tools": statistics.median([tools for _, tools, _ in runs]),
+                "overhead": statistics.median(overheads),
+                "fastest": min(overheads),
+                "spawns": dict(spawns),
+            }
+            result = results[name]
+            if not args.json:
+                spawn_summary = ", ".join(f"{tool} x{count}" for tool, count in spawns.most_common()) or "-"
+                print(f"{name:<18} {result['median']:>7.3f}s {result['tools']:>7.3f}s {result['overhead']:>8.3f}s  {sum(spawns.values())}: {spawn_summary}")
+    finally:
+        shutil.rmtree(workdir)
+    if args.json:
+        print(json.dumps({"baseline": baseline, "latencies": latencies, "flows": results}, indent=2))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"runs": args.runs, "latencies": latencies, "flows": {name: result["fastest"] for name, result in results.items()}}, f, indent=2)
+            f.write("\n")
+    slow = [name for name, result in results.items() if args.max_overhead is not None and result["overhead"] > args.max_overhead]
+    if slow:
+        sys.exit(f"Over the {args.max_overhead}s overhead budget: {', '.join(slow)}")
+    # Flows that aren't in the baseline (new ones, say) have nothing to be compared against yet.
+    regressed = [f"{name} ({result['fastest']:.3f}s, was {recorded[name]:.3f}s)" for name, result in results.items()
+                 if name in recorded and result["fastest"] > max(recorded[name] * (1 + args.tolerance), recorded[name] + NOISE)]
+    if regressed:
+        sys.exit(f"Slower than the baseline in {args.baseline}: {', '.join(regressed)}")
+
+if __name__ == "__main__":
+    main()
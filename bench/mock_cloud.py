@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# A pretend DigitalOcean API, just enough of it for BacBoot's cloud deployments, so they can be tried out and timed
+# without creating (or paying for) real machines. Point BacBoot at it with --cloud-api-url http://127.0.0.1:PORT/v2.
+# Droplets become active --boot-time seconds after they're created, give or take --boot-jitter.
+#
+# Usage: python3 bench/mock_cloud.py [--port 8080] [--boot-time 5] [--boot-jitter 0]
+import argparse
+import http.server
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+class MockCloud:
+    def __init__(self, boot_time=5, boot_jitter=0):
+        self.boot_time = boot_time
+        self.boot_jitter = boot_jitter
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.keys = []
+        self.droplets = {}
+        self.requests = 0
+
+    def droplet(self, droplet_id):
+        droplet = dict(self.droplets[droplet_id])
+        if time.monotonic() >= droplet.pop("active_at"):
+            droplet["status"] = "active"
+            droplet["networks"] = {"v4": [{"ip_address": droplet.pop("address"), "type": "public"}]}
+        else:
+            droplet["status"] = "new"
+            droplet["networks"] = {"v4": []}
+            droplet.pop("address")
+        return droplet
+
+    def handle(self, method, path, body):
+        # Returns (status, response body).
+        with self.lock:
+            self.requests += 1
+            path = path.split("?", 1)[0]
+            if path == "/v2/account/keys" and method == "GET":
+                return 200, {"ssh_keys": self.keys}
+            if path == "/v2/account/keys" and method == "POST":
+                key = {"id": next(self.ids), "name": body["name"], "public_key": body["public_key"], "fingerprint": "00:00"}
+                self.keys.append(key)
+                return 201, {"ssh_key": key}
+            if path == "/v2/droplets" and method == "POST":
+                created = []
+                for name in body.get("names") or [body["name"]]:
+                    droplet_id = next(self.ids)
+                    boot_time = max(0, self.boot_time + random.uniform(-self.boot_jitter, self.boot_jitter))
+                    self.droplets[droplet_id] = {"id": droplet_id, "name": name, "region": {"slug": body["region"]}, "size_slug": body["size"],
+                                                 "address": f"10.{droplet_id // 65536 % 256}.{droplet_id // 256 % 256}.{droplet_id % 256}",
+                                                 "active_at": time.monotonic() + boot_time}
+                    created.append(self.droplet(droplet_id))
+                return 202, {"droplets": created}
+            match = re.fullmatch(r"/v2/droplets/(\d+)", path)
+            if match and method == "GET" and int(match.group(1)) in self.droplets:
+                return 200, {"droplet": self.droplet(int(match.group(1)))}
+            return 404, {"id": "not_found", "message": "The resource you were accessing could not be found."}
+
+    def serve(self, address="127.0.0.1", port=0):
+        # Start serving in a background thread, returning the server (server.server_address has the real port).
+        cloud = self
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, response = cloud.handle(method, self.path, body)
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            def do_GET(self):
+                self.respond("GET")
+            def do_POST(self):
+                self.respond("POST")
+            def log_message(self, format, *args):
+                pass
+        server = http.server.ThreadingHTTPServer((address, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a pretend DigitalOcean API for testing BacBoot's cloud deployments.")
+    parser.add_argument("--port", help="Port to listen on. Default: 8080.", type=int, default=8080)
+    parser.add_argument("--boot-time", help="Seconds before a new droplet becomes active. Default: 5.", type=float, default=5)
+    parser.add_argument("--boot-jitter", help="Randomly spread each droplet's boot time by up to this many seconds. Default: 0.", type=float, default=0)
+    args = parser.parse_args()
+    server = MockCloud(args.boot_time, args.boot_jitter).serve(port=args.port)
+    print(f"Mock cloud API listening on http://127.0.0.1:{server.server_address[1]}/v2")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
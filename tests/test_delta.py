@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Delta upgrades: the instructions compute_delta builds from a host's block signatures, fed to the rebuild script the
+# host runs, must give back exactly the new binary. Both scripts run here just as they would on a host.
+#
+# Usage: python3 -m unittest discover tests (or python3 -m pytest tests)
+import hashlib
+import importlib.util
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+spec = importlib.util.spec_from_file_location("bacboot", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py"))
+bacboot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bacboot)
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="bacboot-delta-")
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.random = random.Random(1)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def delta(self, old, new):
+        # Sign the old binary like a host would, and build the delta for the new one against it.
+        old_path, new_path = self.write("old", old), self.write("new", new)
+        block_size = bacboot.delta_block_size(len(new))
+        signed = subprocess.run([sys.executable, "-c", bacboot.DELTA_SIGNATURE_SCRIPT, old_path, str(block_size)],
+                                capture_output=True, text=True, check=True)
+        signatures = [(int(weak), strong) for weak, strong in (line.split() for line in signed.stdout.splitlines())]
+        return bacboot.compute_delta(new_path, signatures, block_size), block_size, old_path
+
+    def rebuild(self, old_path, delta, block_size, new):
+        target = self.write("target", b"")
+        rebuilt = subprocess.run([sys.executable, "-c", bacboot.DELTA_REBUILD_SCRIPT, old_path, target, hashlib.sha256(new).hexdigest(), str(block_size)],
+                                 input=delta, capture_output=True)
+        self.assertEqual(rebuilt.returncode, 0, rebuilt.stderr.decode())
+        with open(target, "rb") as f:
+            return f.read()
+
+    def test_round_trip(self):
+        old = self.random.randbytes(256 * 1024)
+        # Some bytes changed, some inserted (so everything after them moves) and some taken away at the end.
+        new = bytearray(old[:-5000])
+        new[1000:1010] = b"x" * 10
+        new[100000:100000] = self.random.randbytes(777)
+        new = bytes(new)
+        delta, block_size, old_path = self.delta(old, new)
+        self.assertIsNotNone(delta)
+        self.assertLess(len(delta), len(new) // 4)
+        self.assertEqual(self.rebuild(old_path, delta, block_size, new), new)
+
+    def test_unchanged(self):
+        old = self.random.randbytes(100 * 1024 + 3)
+        delta, block_size, old_path = self.delta(old, old)
+        self.assertEqual(self.rebuild(old_path, delta, block_size, old), old)
+
+    def test_nothing_in_common(self):
+        # Gives up rather than rolling through the whole binary.
+        new = self.random.randbytes(4 * 1024 * 1024)
+        start = time.process_time()
+        delta, _, _ = self.delta(self.random.randbytes(len(new)), new)
+        self.assertIsNone(delta)
+        self.assertLess(time.process_time() - start, 1)
+
+    def test_different_size(self):
+        delta, _, _ = self.delta(self.random.randbytes(10 * 1024), self.random.randbytes(100 * 1024))
+        self.assertIsNone(delta)
+
+if __name__ == "__main__":
+    unittest.main()
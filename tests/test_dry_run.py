@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# A dry run must not change anything: not the hosts in the inventory, and not our copy of the playbook.
+# Every tool BacBoot drives is replaced with a stub that logs how it was called, so we can check nothing
+# that writes to a host ever ran.
+#
+# Usage: python3 -m unittest discover tests (or python3 -m pytest tests)
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+BACBOOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py")
+
+STUBS = {
+    # Report that the playbook is out of date, so BacBoot would normally pull it.
+    "git": """
+if [ "$1" = "remote" ]; then
+    echo "    main pushes to main (local out of date)"
+fi
+""",
+    "ansible": "",
+    "ansible-galaxy": "",
+    "ansible-playbook": """
+echo '{"plays": [], "stats": {"node1": {"ok": 1, "changed": 1, "failures": 0, "unreachable": 0}}}'
+""",
+    "apt": "",
+    "pip3": "",
+    "sudo": """
+"$@"
+""",
+    "ssh-keyscan": """
+echo "${@: -1} ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIDryRunDryRunDryRunDryRunDryRunDryRunDryRun"
+""",
+    # Answer the direct installer's probe like an amd64 host with an old client. Anything else would be a change.
+    "ssh": """
+case "$*" in
+    *"uname -m"*) printf 'x86_64\\n0000\\npython3\\n' ;;
+esac
+""",
+}
+
+INVENTORY = """[bacalhau]
+node1 ansible_host=10.0.0.1
+node2 ansible_host=10.0.0.2
+"""
+
+OVERRIDES = 'bacalhau_version: "v0.9.0"\n'
+
+class DryRunTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp(prefix="bacboot-dry-run-")
+        self.addCleanup(shutil.rmtree, self.home)
+        self.log = os.path.join(self.home, "calls.log")
+        stubs = os.path.join(self.home, "stubs")
+        os.makedirs(stubs)
+        for name, body in STUBS.items():
+            path = os.path.join(stubs, name)
+            with open(path, "w") as f:
+                f.write("#!/usr/bin/env bash\n")
+                f.write(f'echo "{name} $*" >> "$STUB_LOG"\n')
+                f.write(body.lstrip("\n"))
+            os.chmod(path, 0o755)
+        # An existing copy of the playbook, with a version already pinned.
+        self.playbook = os.path.join(self.home, "playbook")
+        os.makedirs(os.path.join(self.playbook, "vars"))
+        for name in ["requirements.yml", "bacalhau-client.yml", "bacalhau-node.yml", "inventory"]:
+            open(os.path.join(self.playbook, name), "w").close()
+        with open(os.path.join(self.playbook, "vars", "overrides.yml"), "w") as f:
+            f.write(OVERRIDES)
+        # A release and its binary, so nothing needs to be downloaded.
+        cache = os.path.join(self.home, "cache")
+        os.makedirs(cache)
+        with open(os.path.join(cache, "bacalhau-v1.0.0-linux-amd64"), "wb") as f:
+            f.write(b"not really bacalhau")
+        self.release = os.path.join(self.home, "release.json")
+        with open(self.release, "w") as f:
+            json.dump({"tag_name": "v1.0.0"}, f)
+        self.inventory = os.path.join(self.home, "inventory")
+        with open(self.inventory, "w") as f:
+            f.write(INVENTORY)
+        self.env = dict(os.environ, PATH=stubs + os.pathsep + os.environ["PATH"], HOME=self.home, STUB_LOG=self.log,
+                        BACBOOT_PLAYBOOK_DIR=self.playbook, BACBOOT_CACHE_DIR=cache)
+
+    def snapshot(self):
+        files = {}
+        for root, _, names in os.walk(self.playbook):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as f:
+                    files[os.path.relpath(os.path.join(root, name), self.playbook)] = f.read()
+        return files
+
+    def dry_run(self, *arguments):
+        before = self.snapshot()
+        process = subprocess.run([sys.executable, BACBOOT, "--release-api", "file://" + self.release, "--inventory", self.inventory,
+                                  "--unattended", "--silent", "--dry-run"] + list(arguments),
+                                 stdin=subprocess.DEVNULL, capture_output=True, text=True, env=self.env, cwd=self.home)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(self.snapshot(), before, "the dry run changed the playbook")
+        with open(self.log) as f:
+            return [line.split() for line in f]
+
+    def assert_hosts_untouched(self, calls):
+        for call in calls:
+            if call[0] == "ssh":
+                self.assertIn("uname", " ".join(call), f"the dry run ran something on a host: {' '.join(call)}")
+            if call[0] == "ansible-playbook":
+                self.assertIn("--check", call, f"the dry run ran a playbook for real: {' '.join(call)}")
+            if call[0] == "git":
+                self.assertNotIn(call[1], ["pull", "fetch", "checkout", "reset"], "the dry run updated the playbook")
+
+    def test_node_install(self):
+        calls = self.dry_run("--install", "node")
+        self.assert_hosts_untouched(calls)
+        playbooks = [" ".join(call) for call in calls if call[0] == "ansible-playbook"]
+        self.assertTrue(playbooks)
+        # The pinned version goes straight to Ansible instead of into the overrides file.
+        self.assertTrue(all("v1.0.0" in playbook for playbook in playbooks))
+
+    def test_client_install(self):
+        calls = self.dry_run("--install", "client")
+        self.assert_hosts_untouched(calls)
+        # Without --method direct, clients on an inventory are still installed with the Ansible client role.
+        self.assertTrue(any(call[0] == "ansible-playbook" and self.inventory in call for call in calls))
+        self.assertFalse(any(call[0] == "ssh" for call in calls))
+
+    def test_direct_client_install(self):
+        calls = self.dry_run("--install", "client", "--method", "direct")
+        self.assert_hosts_untouched(calls)
+        self.assertTrue(any(call[0] == "ssh" for call in calls))
+
+    def test_uninstall_is_refused(self):
+        process = subprocess.run([sys.executable, BACBOOT, "--inventory", self.inventory, "--unattended", "--silent", "--dry-run", "--uninstall"],
+                                 stdin=subprocess.DEVNULL, capture_output=True, text=True, env=self.env, cwd=self.home)
+        self.assertNotEqual(process.returncode, 0)
+        self.assertFalse(os.path.exists(self.log), "the dry run started uninstalling")
+
+if __name__ == "__main__":
+    unittest.main()
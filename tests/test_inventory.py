@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Reading INI inventories ourselves (groups, children and variables, and the group each host shares rollout limits
+# with), and the rates used for bandwidth limits.
+#
+# Usage: python3 -m unittest discover tests (or python3 -m pytest tests)
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+spec = importlib.util.spec_from_file_location("bacboot", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py"))
+bacboot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bacboot)
+
+INVENTORY = """
+# Two edge sites and a core site.
+[edge_site_1]
+edge1 ansible_host=10.0.1.1 ansible_user=ubuntu
+edge2 ansible_host=10.0.1.2
+
+[edge_site_1:vars]
+bacboot_max_hosts=2
+bacboot_bandwidth_limit="2M"
+
+[edge_site_2]
+edge3 ansible_host=10.0.2.1 ; a comment
+
+[core]
+core1 ansible_host=10.0.0.1 bacboot_max_load=0.5
+
+[edge:children]
+edge_site_1
+edge_site_2
+
+[bacalhau_node:children]
+edge
+core
+
+[all:vars]
+ansible_user=root
+bacboot_max_jobs=3
+"""
+
+class InventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="bacboot-inventory-")
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.path.join(self.directory, "inventory")
+        with open(path, "w") as f:
+            f.write(INVENTORY)
+        self.assertTrue(bacboot.is_ini_inventory(path))
+        self.inventory = bacboot.parse_inventory(path)
+
+    def test_groups_and_children(self):
+        self.assertEqual(self.inventory["groups"]["edge_site_2"], ["edge3"])
+        self.assertEqual(self.inventory["groups"]["edge"], ["edge1", "edge2", "edge3"])
+        self.assertEqual(self.inventory["groups"]["bacalhau_node"], ["edge1", "edge2", "edge3", "core1"])
+        hosts = bacboot.inventory_hosts(self.inventory, ["core", "edge"])
+        self.assertEqual([host["name"] for host in hosts], ["core1", "edge1", "edge2", "edge3"])
+
+    def test_variables(self):
+        edge1, edge2 = self.inventory["hosts"]["edge1"], self.inventory["hosts"]["edge2"]
+        # The host's own variables win over its groups', which win over "all".
+        self.assertEqual(edge1["vars"]["ansible_user"], "ubuntu")
+        self.assertEqual(edge2["vars"]["ansible_user"], "root")
+        self.assertEqual(edge2["vars"]["ansible_host"], "10.0.1.2")
+        self.assertEqual(edge2["vars"]["bacboot_bandwidth_limit"], "2M")
+        self.assertEqual(self.inventory["hosts"]["edge3"]["vars"]["ansible_host"], "10.0.2.1")
+
+    def test_throttle_group(self):
+        hosts = self.inventory["hosts"]
+        # The first group that sets a limit, then "all", which sets one for everybody.
+        self.assertEqual(hosts["edge1"]["throttle_group"], "edge_site_1")
+        self.assertEqual(hosts["edge3"]["throttle_group"], "all")
+        self.assertEqual(hosts["core1"]["throttle_group"], "all")
+
+    def test_limits(self):
+        args = bacboot.argparse.Namespace(bandwidth_limit=None, max_hosts_per_group=None, max_load=None, max_running_jobs=None)
+        limits = bacboot.host_throttle_limits(args, self.inventory["hosts"]["edge1"])
+        self.assertEqual(limits, {"group": "edge_site_1", "max_hosts": 2, "bandwidth": 2 * 1024 ** 2, "max_load": None, "max_jobs": 3})
+        self.assertEqual(bacboot.host_throttle_limits(args, self.inventory["hosts"]["core1"])["max_load"], 0.5)
+        self.inventory["hosts"]["edge2"]["vars"]["bacboot_max_hosts"] = "2.5"
+        with self.assertRaisesRegex(ValueError, "edge2: bacboot_max_hosts"):
+            bacboot.host_throttle_limits(args, self.inventory["hosts"]["edge2"])
+
+class RateTest(unittest.TestCase):
+    def test_rates(self):
+        self.assertEqual(bacboot.parse_rate("500K"), 500 * 1024)
+        self.assertEqual(bacboot.parse_rate("10M"), 10 * 1024 ** 2)
+        self.assertEqual(bacboot.parse_rate("1.5g"), 1.5 * 1024 ** 3)
+        self.assertEqual(bacboot.parse_rate("2MB/s"), 2 * 1024 ** 2)
+        self.assertEqual(bacboot.parse_rate("100"), 100)
+        self.assertIsNone(bacboot.parse_rate(""))
+        self.assertIsNone(bacboot.parse_rate(None))
+
+    def test_bad_rates(self):
+        for rate in ["10Mbit", "fast", "0", "0.5", "-1M", "nan", "inf", "M"]:
+            with self.assertRaises(ValueError, msg=rate):
+                bacboot.parse_rate(rate)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# The prerequisite cache: BacBoot looks for its tools once per run by searching PATH itself, and only looks again
+# once it has installed or removed something.
+#
+# Usage: python3 -m unittest discover tests (or python3 -m pytest tests)
+import asyncio
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+spec = importlib.util.spec_from_file_location("bacboot", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py"))
+bacboot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bacboot)
+
+class PrerequisiteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="bacboot-prerequisites-")
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = self.directory
+        self.addCleanup(os.environ.__setitem__, "PATH", path)
+        bacboot.forget_prerequisites()
+        self.addCleanup(bacboot.forget_prerequisites)
+
+    def install(self, tool, output=""):
+        path = os.path.join(self.directory, tool)
+        with open(path, "w") as f:
+            f.write(f"#!/bin/sh\necho '{output}'\n")
+        os.chmod(path, 0o755)
+        return path
+
+    def test_finds_tools_on_path(self):
+        git = self.install("git")
+        paths = bacboot.find_prerequisites()
+        self.assertEqual(set(paths), set(bacboot.PREREQUISITES))
+        self.assertEqual(paths["git"], git)
+        self.assertIsNone(paths["docker"])
+        self.assertTrue(bacboot.has_prerequisite("git"))
+        self.assertFalse(bacboot.has_prerequisite("git", "docker"))
+
+    def test_cached_until_forgotten(self):
+        self.assertFalse(bacboot.has_prerequisite("docker"))
+        docker = self.install("docker")
+        # Still cached from before, so we don't search PATH again.
+        self.assertFalse(bacboot.has_prerequisite("docker"))
+        bacboot.forget_prerequisites()
+        self.assertEqual(bacboot.find_prerequisites()["docker"], docker)
+
+    def test_versions(self):
+        self.install("git", "git version 2.40.1")
+        self.install("ssh")
+        asyncio.run(bacboot.find_prerequisite_versions(["git", "ssh"]))
+        self.assertEqual(bacboot.prerequisite_versions["git"], "git version 2.40.1")
+        # ssh printed nothing at all, so we don't know its version.
+        self.assertIsNone(bacboot.prerequisite_versions["ssh"])
+        bacboot.forget_prerequisites()
+        self.assertEqual(bacboot.prerequisite_versions, {})
+
+if __name__ == "__main__":
+    unittest.main()
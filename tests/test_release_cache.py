@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Resolving "latest": BacBoot asks the release API once per run, remembers the answer on disk for --release-cache-ttl
+# seconds, and pins it for every host. These tests point it at a stand-in release API that counts how often it's asked.
+#
+# Usage: python3 -m unittest discover tests (or python3 -m pytest tests)
+import argparse
+import http.server
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+spec = importlib.util.spec_from_file_location("bacboot", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bacboot.py"))
+bacboot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bacboot)
+
+class ReleaseAPI(http.server.ThreadingHTTPServer):
+    # Answers every request with the latest release, or a server error when there isn't one.
+    def __init__(self):
+        self.release, self.requests = {"tag_name": "v1.2.3"}, 0
+        super().__init__(("127.0.0.1", 0), ReleaseHandler)
+
+class ReleaseHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.release is None:
+            self.send_error(500)
+            return
+        body = json.dumps(self.server.release).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ReleaseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.api = ReleaseAPI()
+        threading.Thread(target=self.api.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.api.server_close)
+        self.addCleanup(self.api.shutdown)
+        cache = tempfile.mkdtemp(prefix="bacboot-release-cache-")
+        self.addCleanup(shutil.rmtree, cache)
+        self.cache_file = os.path.join(cache, "latest-release.json")
+        directory = bacboot.BACBOOT_CACHE_DIR
+        bacboot.BACBOOT_CACHE_DIR = cache
+        self.addCleanup(setattr, bacboot, "BACBOOT_CACHE_DIR", directory)
+        self.args = argparse.Namespace(version="latest", release_cache_ttl=3600,
+                                       release_api=f"http://127.0.0.1:{self.api.server_address[1]}/releases/latest")
+        self.new_run()
+
+    def new_run(self):
+        # Each run of BacBoot starts without remembering anything but what's on disk.
+        bacboot.latest_releases.clear()
+
+    def test_asks_once_per_run(self):
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.2.3")
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.2.3")
+        self.assertEqual(self.api.requests, 1)
+
+    def test_cached_between_runs(self):
+        bacboot.resolve_bacalhau_version(self.args)
+        self.api.release = {"tag_name": "v1.2.4"}
+        self.new_run()
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.2.3")
+        self.assertEqual(self.api.requests, 1)
+
+    def test_expires(self):
+        bacboot.resolve_bacalhau_version(self.args)
+        self.api.release = {"tag_name": "v1.2.4"}
+        self.new_run()
+        self.args.release_cache_ttl = 0
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.2.4")
+        self.assertEqual(self.api.requests, 2)
+
+    def test_other_api_or_damaged_cache(self):
+        bacboot.resolve_bacalhau_version(self.args)
+        self.new_run()
+        self.args.release_api += "?again"
+        bacboot.resolve_bacalhau_version(self.args)
+        self.assertEqual(self.api.requests, 2)
+        for damage in ['{"api": "%s", "version": 3, "fetched": 0}' % self.args.release_api, "{", "[]"]:
+            with open(self.cache_file, "w") as f:
+                f.write(damage)
+            self.new_run()
+            self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.2.3")
+        self.assertEqual(self.api.requests, 5)
+
+    def test_api_unavailable(self):
+        self.api.release = None
+        # Each host works "latest" out for itself, unless we need the real release.
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "latest")
+        self.new_run()
+        with self.assertRaises(OSError):
+            bacboot.resolve_bacalhau_version(self.args, fallback=None)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_explicit_version(self):
+        self.args.version = "1.0.0"
+        self.assertEqual(bacboot.resolve_bacalhau_version(self.args), "v1.0.0")
+        self.assertEqual(self.api.requests, 0)
+
+if __name__ == "__main__":
+    unittest.main()